@@ -1,8 +1,15 @@
 import pygame as pg
-import random
+import logging
 import os
 
+from assets import list_assets, load_image
+from atlas import TextureAtlas
 from settings import scale
+from collision import collide_swept
+from render import LAYER_FLEET
+from waves import Wave, load_wave_specs
+
+logger = logging.getLogger(__name__)
 
 
 class AlienFleet(pg.sprite.Group):
@@ -10,142 +17,311 @@ class AlienFleet(pg.sprite.Group):
     def __init__(self, game):
         super().__init__()
         """
-        Find the best spacing between each alien in the fleet based on a given
-        usable width and a given usable height. The fleet will be positioned
-        in a grid that roughly fills the given usable area.
+        Load the wave definitions and the alien images, then build the
+        first wave. Each wave positions the fleet in its own formation and
+        moves it along paths that are baked when the wave is loaded.
         """
         self.game = game
 
-        # information used to space the fleet
-        usable_w = game.rect.width
-        usable_h = .55 * game.rect.height
-        self.num_columns = game.vars.fleet_columns
-        self.num_rows = game.vars.fleet_rows
-        # space between each alien's starting x, y)
-        self.hoz_spacing = usable_w / self.num_columns
-        self.vert_spacing = usable_h / self.num_rows
-
-        # load possible ship surfaces
+        # load possible ship surfaces as (surface, mask) tuples
         self.image_pool = []
         self.image_folder = os.path.join('images/', 'alien_ships/')
         self._load_image_pool()
+        # formations are spaced for the largest alien image
+        self.alien_size = (max(image.get_width() for image, _ in self.image_pool),
+                           max(image.get_height() for image, _ in self.image_pool))
+
+        # waves are played in file name order, then repeat
+        self.wave_specs = load_wave_specs(game.vars.wave_folder)
+        self.wave_index = -1
+        self.wave = None
+        # seconds since the current wave started
+        self.wave_time = 0.0
+        # aliens that reached the floor or hit the player since the game began
+        self.floor_contacts = 0
+        self.ship_contacts = 0
+
+        # the next wave is prepared ahead of time by a generator, see
+        # _prepare_next_wave(). Once ready it is (wave index, wave, aliens)
+        self._builder = None
+        self._next_wave = None
+        # aliens of the current wave still waiting to be spawned
+        self._spawn_queue = []
 
         self._build_new_fleet()
 
     def _load_image_pool(self):
         """
-        Load each image from the alien ship image folder into the group's
-        image pool list so that each image can be randomly assigned to new
-        Alien instances being put into the fleet.
+        Load and scale each image from the alien ship image folder into the
+        group's image pool list so that each image can be randomly assigned to
+        new Alien instances being put into the fleet. The collision mask of
+        each scaled image is built here once and shared by every alien that
+        uses the image. The scaled images are packed into one atlas, the pool
+        holds subsurfaces of it.
         """
+        images = []
+        for file_name in list_assets(self.image_folder):
+            image = load_image(self.image_folder + file_name).convert_alpha()
+            image, _ = scale(image, self.game.screen,
+                             self.game.vars.alien_scale)
+            images.append(image)
+
+        self.atlas = TextureAtlas(images)
         self.image_pool = [
-            pg.image.load(self.image_folder + file_name).convert_alpha()
-            for file_name in os.listdir(self.image_folder)
+            (frame, pg.mask.from_surface(frame)) for frame in self.atlas.frames
         ]
 
     def _build_new_fleet(self):
         """
-        Create an evenly spaced 'fleet' of alien objects by multiplying
-        the aliens row/column position by a pre-determiend vertical and
-        horizontal spacing
+        Load the next wave and spawn its whole fleet at once. Used when a
+        game starts, during play the fleet is built in the background instead
         """
-        def random_image(): return random.choice(self.image_pool)
+        self._cancel_builder()
+        self._finish_builder()
+        self._start_next_wave()
+        self._spawn_aliens(len(self._spawn_queue))
+
+    def _prepare_next_wave(self):
+        """
+        Generator that loads the wave after the current one, baking its paths,
+        and creates an alien for each slot of its formation, one step per
+        yield. The aliens get their images when the wave starts so building
+        never draws from the game's random generator.
+        """
+        wave_index = (self.wave_index + 1) % len(self.wave_specs)
+        wave = Wave(self.wave_specs[wave_index], self.game, self.alien_size)
+        yield
+
+        aliens = []
+        for index in range(len(wave.slots)):
+            alien = self.Alien(self, 0)
+            alien.set_motion(*wave.motion(index))
+            aliens.append(alien)
+            yield
+        self._next_wave = (wave_index, wave, aliens)
+
+    def _advance_builder(self, steps):
+        """Run up to 'steps' steps of building the next wave"""
+        if self._next_wave is not None:
+            return
+        if self._builder is None:
+            self._builder = self._prepare_next_wave()
+        for _ in range(steps):
+            try:
+                next(self._builder)
+            except StopIteration:
+                self._builder = None
+                return
+
+    def _finish_builder(self):
+        """Build whatever is left of the next wave right away"""
+        while self._next_wave is None:
+            self._advance_builder(1)
+
+    def _cancel_builder(self):
+        """Drop the prepared wave and any aliens waiting to spawn"""
+        self._builder = None
+        self._next_wave = None
+        self._spawn_queue = []
+
+    def _start_next_wave(self):
+        """Make the prepared wave current and queue its aliens to spawn"""
+        self.wave_index, self.wave, aliens = self._next_wave
+        self._next_wave = None
+        self.wave_time = 0.0
+        for alien in aliens:
+            alien.set_image(self.game.rng.randrange(len(self.image_pool)))
+        self._spawn_queue = aliens
+
+    def _spawn_aliens(self, count):
+        """Move up to 'count' aliens from the spawn queue into the fleet"""
+        spawned = self._spawn_queue[:count]
+        del self._spawn_queue[:count]
+        for alien in spawned:
+            alien.place()
+            self.add(alien)
+
+    def wave_aliens(self):
+        """
+        Return the aliens of the current wave, the spawned ones first, then
+        the ones still queued
+        """
+        return self.sprites() + self._spawn_queue
+
+    def queued_count(self):
+        """Return how many aliens of the current wave have not spawned"""
+        return len(self._spawn_queue)
+
+    def reset(self):
+        """Remove every alien and start again from the first wave"""
+        self.empty()
+        self.wave_index = -1
+        self.floor_contacts = self.ship_contacts = 0
+        self._build_new_fleet()
 
-        for row in range(self.num_rows):
-            row_of_aliens = [
-                self.Alien(self.game, random_image())
-                for col in range(self.num_columns)
-            ]
-            # move each alien in the row to it's correct x,y position
-            for column, alien in enumerate(row_of_aliens, start=0):
-                alien.x += column * self.hoz_spacing
-                alien.y += row * self.vert_spacing
+    def restore(self, wave_index, wave_time, aliens, queued=0,
+                floor_contacts=0, ship_contacts=0):
+        """
+        Replace the fleet with a saved one. aliens is a sequence of
+        (image index, base x, base y, phase, delay) tuples, the last 'queued'
+        of them go back to the spawn queue.
+        """
+        self.empty()
+        self._cancel_builder()
+        self.wave_index = wave_index
+        self.wave = Wave(self.wave_specs[wave_index], self.game,
+                         self.alien_size)
+        self.wave_time = wave_time
+        self.floor_contacts = floor_contacts
+        self.ship_contacts = ship_contacts
 
-            self.add(*row_of_aliens)
+        aliens = list(aliens)
+        spawned = len(aliens) - queued
+        for i, (image_index, *motion) in enumerate(aliens):
+            alien = self.Alien(self, image_index)
+            alien.set_motion(*motion)
+            if i < spawned:
+                alien.place()
+                self.add(alien)
+            else:
+                # placed once it spawns
+                self._spawn_queue.append(alien)
 
     def update(self, dt):
         """Perform actions to the group as a whole. Overrides super method"""
-        # add a new fleet immediately after the old one in destroyed
-        if len(self) == 0:
-            self._build_new_fleet()
+        steps = self.game.vars.fleet_build_per_frame
+        if self._spawn_queue:
+            # bring the new wave in a few aliens at a time, they all share
+            # the wave time so late arrivals still land in formation
+            self._spawn_aliens(self.game.vars.fleet_spawn_per_frame)
+        elif len(self) == 0:
+            # the old fleet is gone, start the next wave once it is built
+            self._advance_builder(steps)
+            if self._next_wave is not None:
+                self._start_next_wave()
+                self._spawn_aliens(self.game.vars.fleet_spawn_per_frame)
+        else:
+            # use the frames the current wave is alive to build the next one
+            self._advance_builder(steps)
 
+        self.wave_time += dt
         for alien in self.sprites():
             alien.update(dt)
 
+    def submit(self, frame):
+        """
+        Submit every alien that is on screen at its current position, as an
+        area of the atlas. Entering aliens start above the screen.
+        """
+        atlas = self.atlas.surface
+        areas = self.atlas.rects
+        screen_rect = self.game.rect
+        frame.submit_many(LAYER_FLEET, [
+            (atlas, alien.rect.topleft, areas[alien.image_index])
+            for alien in self.sprites()
+            if alien.rect.colliderect(screen_rect)
+        ])
+
     class Alien(pg.sprite.Sprite):
-        def __init__(self, game, image):
+        def __init__(self, fleet, image_index):
             super().__init__()
             """
             Represents an enemy ship that is part of a larger group (fleet) of
             aliens.
             """
-            # get access to attributes of the main game class
-            self.game = game
-
-            # Load a random alien image and get the surface and rect
-            self.image = image
+            # get access to attributes of the fleet and the main game class
+            self.fleet = fleet
+            self.game = fleet.game
 
-            self.image, self.rect = scale(image, self.game.screen,
-                                          self.game.vars.alien_scale)
+            # pre-scaled image and its collision mask from the fleet's pool
+            self.image_index = image_index
+            self.image, self.mask = fleet.image_pool[image_index]
+            self.rect = self.image.get_rect()
+            # where the alien was before its last update, for swept collision
+            self.prev_rect = self.rect.copy()
 
             self.point_value = 10
 
             # Used to keep accurate count of current pixel location
             self.x = self.y = 0.0
-            # velocity
-            self.vel_x = self.game.vars.alien_vel_x
-            self.drop_height = self.game.vars.fleet_drop_height
+            # position along the wave's paths, see set_motion()
+            self.base_x = self.base_y = 0.0
+            self.phase = 0.0
+            self.delay = 0.0
+
+        def set_image(self, image_index):
+            """Switch to another image of the fleet's pool"""
+            self.image_index = image_index
+            self.image, self.mask = self.fleet.image_pool[image_index]
+            self.rect.size = self.image.get_size()
+
+        def set_motion(self, base_x, base_y, phase, delay):
+            """
+            Set the base position the paths are added to, how far along the
+            formation path the alien starts and how long it waits to enter
+            """
+            self.base_x, self.base_y = base_x, base_y
+            self.phase = phase
+            self.delay = delay
 
         def update(self, dt):
             """
-            -Move self left / right. If colliding with wall, reverse direction and
-            move down one level.
+            -Move along the wave's paths.
             -Aliens that hit the player or the floor both have different behaviors.
             """
-            rect = self.rect
-            g_rect = self.game.rect
-
-            # move on the x-axis
-            self.x += self.vel_x * dt
+            self.prev_rect.update(self.rect)
+            self.follow_paths()
 
             # player collision
-            if self.rect.colliderect(self.game.ship.rect):
+            if collide_swept(self, self.game.ship):
                 self._hit_player_ship()
             # floor collision
-            if rect.bottom > g_rect.bottom:
+            if self.rect.bottom > self.game.rect.bottom:
                 self._hit_bottom()
-            
-            # screen edge collisions
-            def moving_left(): return self.vel_x < 0
-            def moving_right(): return self.vel_x > 0
-            def colliding_left(): return rect.left < 0
-            def colliding_right(): return rect.right > g_rect.w
-            # reverse and move down on wall collision
-            if colliding_left() and moving_left():
-                rect.left = g_rect.left
-                self.vel_x *= -1
-                self.y += self.drop_height
-            elif colliding_right() and moving_right():
-                rect.right = g_rect.right
-                self.vel_x *= -1
-                self.y += self.drop_height
-
-            rect.topleft = (self.x, self.y)
+
+        def place(self):
+            """Move to the current path position without sweeping there"""
+            self.follow_paths()
+            self.prev_rect.update(self.rect)
+
+        def follow_paths(self):
+            """
+            Look up the alien's position on the wave's entry and formation
+            paths at the current wave time
+            """
+            wave = self.fleet.wave
+            t = self.fleet.wave_time - self.delay
+
+            formation_t = t - wave.entry_time
+            if formation_t < 0:
+                formation_t = 0.0
+            path_x, path_y = wave.path.lookup(self.phase + formation_t)
+            self.x = self.base_x + path_x
+            self.y = self.base_y + path_y
+            if wave.entry and t < wave.entry_time:
+                entry_x, entry_y = wave.entry.lookup(t)
+                self.x += entry_x
+                self.y += entry_y
+
+            self.rect.topleft = (self.x, self.y)
 
         def _hit_bottom(self):
             """ Do a series of actions when the alien reaches the bottom"""
-            print('hit bottom', end=' ')
+            logger.debug('hit bottom')
+            self.fleet.floor_contacts += 1
+            self.game.analytics.floor_contacts += 1
             self.blow_up()
 
         def _hit_player_ship(self):
             """ Do a series of actions when an alien hits the player"""
-            print('hit player', end=' ')
+            logger.debug('hit player')
+            self.fleet.ship_contacts += 1
+            self.game.analytics.ship_contacts += 1
+            self.game.sounds.play('hit')
             self.blow_up()
 
         def blow_up(self):
             """Creates an effect before removing self from group"""
-            print('ALIEN SHIP EXPLOSION!')
-            self.remove(self.game.alien_fleet)
-
-        def blitme(self):
-            self.game.screen.blit(self.image, self.rect)
+            logger.debug('ALIEN SHIP EXPLOSION!')
+            self.game.sounds.play('explosion')
+            self.remove(self.fleet)
@@ -1,71 +1,192 @@
 import pygame as pg
+from functools import partial
+from time import perf_counter
+import logging
+import os
+import random
 import sys
 
 import settings
+from assets import load_image
+import snapshot
+from collision import collide_swept
 from menu import MenuManager
 from overlays import Scoreboard, FpsDisplay
-from visual_fx import AsteroidGroup
+from visual_fx import AsteroidGroup, Starfield
 from ship import Ship
 from alien import AlienFleet
+from quality import QualityController
+from metrics import RollingStats
+from pacing import FramePacer
+from pipeline import SimulationThread
+from render import RenderQueue, LAYER_BG
+from spectator import SpectatorServer
+from sound import SoundBank
+from analytics import SessionRecorder
+from debug_overlay import DebugOverlay
+import ecs
 
 
 class AlienInvasion:
     """overall class to manage game assets and behavior, thanks to Python Crash
     Course for the wonderful explanation of the main game loop"""
 
-    def __init__(self):
-        """initialize the game, and create game resources"""
+    def __init__(self, headless=False, render_h=None, pixel_buffer=None):
+        """
+        initialize the game, and create game resources. A headless game
+        draws into pixel_buffer (a writable RGBX buffer of the screen size,
+        allocated if not given) instead of a window, see env.py.
+        """
         pg.init()
-        self.vars = settings.Vars()
+        self.vars = settings.Vars(render_h)
+        self.headless = headless
         self.clock = pg.time.Clock()
+        self.pacer = FramePacer(self)
         self.dt = 0
+        # when the current frame's work started, and how long the work of
+        # the last presented frame took in ms, see _present()
+        self.frame_start = 0.0
+        self.work_ms = 0.0
         self.debug = False
         self.state = 'menu'  # 'game'
         self.first_frame = True
-
-        # create the screen and get its rect
-        self.screen = pg.display.set_mode(
-            (self.vars.window_w, self.vars.window_h),
-            flags=pg.HWSURFACE
-        )
+        # every random choice in the game comes from this generator, so it
+        # can be seeded and saved with the game state
+        self.rng = random.Random()
+
+        # create the window. Everything is drawn onto the screen surface,
+        # which is the window itself unless a lower render resolution is set
+        screen_size = self.vars.screen_w, self.vars.screen_h
+        if headless:
+            # a display is still needed to convert surfaces
+            self.window = pg.display.set_mode((1, 1))
+            # there is no real display to sync to
+            if self.pacer.mode == 'vsync':
+                self.pacer.mode = 'uncapped'
+            if pixel_buffer is None:
+                pixel_buffer = bytearray(screen_size[0] * screen_size[1] * 4)
+            self.pixel_buffer = pixel_buffer
+            self.screen = pg.image.frombuffer(pixel_buffer, screen_size, 'RGBX')
+        else:
+            self.window = self._create_window()
+            if screen_size == self.window.get_size():
+                self.screen = self.window
+            else:
+                self.screen = pg.Surface(screen_size).convert()
         self.rect = self.screen.get_rect()
 
         pg.display.set_caption("Space Knockoffs!")
 
         # set the background
-        bg_surface = pg.image.load('images/bg.bmp').convert()
+        bg_surface = load_image('images/bg.bmp').convert()
         self.bg = pg.transform.scale(bg_surface, self.rect.size)
+        self.starfield = None
+        if self.vars.starfield:
+            self.starfield = Starfield(self, self.bg)
+        self.render = RenderQueue(self.screen)
         # Initialize objects
+        self.sounds = SoundBank(self)
+        self.analytics = SessionRecorder(self)
         self.input_manager = InputManager(self)
         self.menu = MenuManager(self)
         self.scoreboard = Scoreboard(self)
         self.fps_display = FpsDisplay(self)
+        # entity tables and the systems that update them, see ecs.py
+        self.world = ecs.World(self.rect.size)
         self.ship = Ship(self)
         self.alien_fleet = AlienFleet(self)
         self.asteroids = AsteroidGroup(self)
+        self._add_systems()
+        self.quality = QualityController(self)
+        self.debug_overlay = DebugOverlay(self)
+
+        # update the game on its own thread while the main thread draws
+        self.simulation = None
+        if self.vars.pipelined:
+            self.simulation = SimulationThread(self)
+            self.simulation.start()
+
+        # stream the game to spectators
+        self.spectator = None
+        if self.vars.spectator:
+            self.spectator = SpectatorServer(self)
+            if not self.spectator.start():
+                # play on without spectators
+                self.spectator = None
+
+    def _add_systems(self):
+        """Add the systems that update the world's tables, in run order"""
+        self.world.add_system('movement', ecs.movement)
+        self.world.add_system('align bullets', self.ship.align_bullets)
+        self.world.add_system('expire', ecs.expire)
+        self.world.add_system('bounds', ecs.bounds)
+        self.world.add_system('sync rects', ecs.sync_rects)
 
     def run_game(self):
         """Main loop for checking events and updating objects.
         once everything is updated, the _update_screen method is called."""
 
         while True:
-            # tick game clock, set max frame rate, get delta time in seconds
-            self.dt = self.clock.tick(self.vars.max_fps) / 1000.0
-            if self.dt > 0.10:
-                self.dt = 0.10
-
-            self.input_manager.check_events()
-
-            if self.state == 'game' or self.first_frame:
-                self.first_frame = False
+            self._run_frame()
+
+    def _run_frame(self):
+        """Tick the clock, then handle input, update and draw one frame"""
+        # tick game clock, wait as the pacing mode says, get delta time in
+        # seconds
+        self.dt = self.pacer.tick() / 1000.0
+        if self.dt > 0.10:
+            self.dt = 0.10
+        self.frame_start = perf_counter()
+
+        # the game objects must not be touched while the simulation runs
+        if self.simulation:
+            self.simulation.wait()
+
+        if self.spectator:
+            self.spectator.publish()
+
+        self.input_manager.check_events()
+
+        if self.state == 'game' or self.first_frame:
+            self.first_frame = False
+            # work done for the last frame, not counting the wait in tick()
+            # or for the vertical sync in flip()
+            self.quality.update(self.work_ms)
+            if self.starfield:
+                # scrolled with the update rather than when drawing, and on
+                # the main thread, which is the one that draws the layers
+                self.starfield.update(self.dt)
+            if self.simulation:
+                self.simulation.step(self.dt)
+            else:
                 self._update_game(self.dt)
 
-            elif self.state == 'menu':
-                self.menu.update_menu()
+        elif self.state == 'menu':
+            self.menu.update_menu()
 
+        # nothing is visible while minimized
+        if not self.pacer.minimized:
             self._draw_screen()
+            self._present()
+            self.input_manager.frame_presented()
 
-            pg.display.flip()
+    def _create_window(self):
+        """
+        Create the display window. Vsync pacing needs a SCALED window with
+        vsync requested, if the driver refuses, fall back to a normal window.
+        """
+        size = self.vars.window_w, self.vars.window_h
+        if self.vars.frame_pacing == 'vsync':
+            try:
+                window = pg.display.set_mode(
+                    size, flags=pg.HWSURFACE | pg.SCALED, vsync=1
+                )
+                self.pacer.vsync = True
+                return window
+            except pg.error as e:
+                logging.warning('vsync unavailable (%s), pacing uncapped', e)
+                self.pacer.mode = 'uncapped'
+        return pg.display.set_mode(size, flags=pg.HWSURFACE)
 
     def _update_game(self, dt):
         """
@@ -74,62 +195,178 @@ class AlienInvasion:
         """
         # FX
         self.asteroids.update(dt)
+        # Player ship, moved first so aliens sweep against its new position
+        self.ship.update(dt)
         # Alien fleet
         self.alien_fleet.update(dt)
-        # Player ship
-        self.ship.update(dt)
-        self.ship.bullets.update(dt)
+        # bullets and asteroid movement
+        self.world.update(dt)
         self._bullet_alien_collide()
         # Overlays
         self.scoreboard.update()
 
+        self.analytics.record_frame(self.clock.get_time())
+
     def _draw_screen(self):
         """
-        Handle drawing of all objects to the screen. The menu is only drawn
-        if in menu mode
+        Handle drawing of all objects to the screen. Everything is submitted
+        to the render queue, which then draws it layer by layer. The menu is
+        only drawn if in menu mode, over a still of the paused game
         """
-
-        self._draw_game()
+        frame = self.render.frame
 
         if self.state == 'menu':
-            self.menu.draw_menu()
+            frame.submit_static(LAYER_BG, 'paused_game', self._capture_game)
+            self.menu.submit_menu(frame)
+        else:
+            self._submit_game(frame)
+            if self.debug:
+                # collected with the game's snapshot
+                source = self.simulation.front if self.simulation else frame
+                self.debug_overlay.submit(frame, source.debug)
 
         if self.vars.show_fps:
             self.fps_display.update()
-            self.fps_display.blit_self()
+            self.fps_display.submit(frame)
+
+        self.render.flush()
 
-    def _draw_game(self):
+    def _present(self):
+        """
+        Scale the screen surface up to the window if rendering at a lower
+        resolution, then flip the display
         """
-        blit game surfaces onto the screen. These are always blitted. If the
-        menu is open, the game elements will be blitted underneath of the menu.
+        if self.screen is not self.window:
+            pg.transform.scale(self.screen, self.window.get_size(), self.window)
+        self.work_ms = (perf_counter() - self.frame_start) * 1000
+        pg.display.flip()
+
+    def to_screen_pos(self, window_pos):
+        """Convert a window (mouse) position to a screen surface position"""
+        if self.screen is self.window:
+            return window_pos
+        return (window_pos[0] * self.rect.w // self.vars.window_w,
+                window_pos[1] * self.rect.h // self.vars.window_h)
+
+    def _submit_game(self, frame):
         """
+        Submit the game surfaces to the render frame. These are always drawn.
+        If the menu is open, the game elements will be drawn underneath of the
+        menu. In pipelined mode the last snapshot is drawn instead of the
+        sprites.
+        """
+        if self.starfield:
+            self.starfield.submit(frame)
+        else:
+            frame.submit_static(LAYER_BG, 'bg', lambda: ((self.bg, (0, 0)),))
 
-        self.screen.blit(self.bg, (0, 0))
+        if self.simulation:
+            frame.extend(self.simulation.front)
+        else:
+            self.submit_snapshot(frame)
 
+    def _capture_game(self):
+        """
+        Draw the game once onto its own surface, dimmed and blurred as a
+        backdrop for the menu. Returns a blit sequence for submit_static, the
+        still is re-used until the game changes, see _unfreeze().
+        """
+        game_frame = self.render.new_frame()
+        self._submit_game(game_frame)
+        surf = pg.Surface(self.rect.size).convert()
+        self.render.draw(game_frame, surf)
+
+        blur = self.vars.menu_backdrop_blur
+        if blur > 1:
+            # shrinking and growing back again smears each pixel over
+            # roughly 'blur' pixels
+            small = pg.transform.smoothscale(
+                surf, (max(1, self.rect.w // blur), max(1, self.rect.h // blur))
+            )
+            surf = pg.transform.smoothscale(small, self.rect.size)
+        if self.vars.menu_backdrop_dim < 1:
+            value = int(255 * self.vars.menu_backdrop_dim)
+            surf.fill((value, value, value), special_flags=pg.BLEND_MULT)
+        return ((surf, (0, 0)),)
+
+    def _unfreeze(self):
+        """Drop the still of the paused game so the next one is fresh"""
+        self.render.invalidate('paused_game')
+
+    def submit_snapshot(self, frame):
+        """
+        Submit the position and surface of each game object to a render
+        frame. Only immutable positions are submitted, so the frame stays
+        valid while the sprites keep moving.
+        """
         # FX
-        self.asteroids.draw(self.screen)
-
+        self.asteroids.submit(frame)
         # Player ship
-        for bullet in self.ship.bullets:
-            bullet.draw_bullet()
-        self.ship.blit_self()
-
+        self.ship.submit(frame)
         # Alien fleet
-        self.alien_fleet.draw(self.screen)
-
+        self.alien_fleet.submit(frame)
         # Overlays
-        self.scoreboard.blit_self()
+        self.scoreboard.submit(frame)
+        if self.debug and self.state == 'game':
+            self.debug_overlay.collect(frame)
+
+    def new_game(self, seed=None):
+        """
+        Start over from the first wave with a zero score. Seeding makes the
+        new game repeatable.
+        """
+        if seed is not None:
+            self.rng.seed(seed)
+        self.scoreboard.player_score = 0
+        self.scoreboard.update()
+
+        self.ship.restore(self.rect.centerx - self.ship.rect.w / 2, False, False)
+        self.ship.clear_bullets()
+
+        self.alien_fleet.reset()
+        self.asteroids.reset()
+        self.quality.apply_level(self.quality.level)
+        self._unfreeze()
+
+    def snapshot(self):
+        """Return the current game state as compact snapshot bytes"""
+        return snapshot.dump(self)
+
+    def restore(self, data):
+        """Continue the game from snapshot bytes made by snapshot()"""
+        snapshot.load(self, data)
+        self._unfreeze()
+
+    def quick_save(self):
+        """Write a snapshot of the game to the quick save file"""
+        os.makedirs(os.path.dirname(self.vars.quick_save_path), exist_ok=True)
+        with open(self.vars.quick_save_path, 'wb') as f:
+            f.write(self.snapshot())
+
+    def quick_load(self):
+        """Restore the game from the quick save file, if there is one"""
+        try:
+            with open(self.vars.quick_save_path, 'rb') as f:
+                self.restore(f.read())
+        except FileNotFoundError:
+            logging.info('no quick save to load')
 
     def _bullet_alien_collide(self):
         """
         Collide all the bullet sprites will all the alien sprites, remove the
-        bullet and then blow up the alien
+        bullet and then blow up the alien. Collision is swept and
+        pixel-perfect, so a bullet hits an alien it passed through between
+        two updates, however long the update was.
         """
-        collisions = pg.sprite.groupcollide(self.ship.bullets, self.alien_fleet,
-                                            False, False)
+        collisions = self.world.collide(self.ship.bullet_table,
+                                        self.alien_fleet.sprites(),
+                                        collide_swept)
+        if self.debug and collisions:
+            self.debug_overlay.add_hits(collisions)
         for alien_list in collisions.values():
             for alien in alien_list:
                 self.scoreboard.player_score += alien.point_value
+                self.analytics.hits += 1
                 alien.blow_up()
 
         if not self.vars.bullets_persist:
@@ -139,14 +376,31 @@ class AlienInvasion:
     def toggle_menu(self):
         """Switch state to 'menu' if in 'game' and visa versa"""
         self.state = 'game' if self.state == 'menu' else 'menu'
+        self._unfreeze()
 
     def quit_game(self):
         """save data as needed and close the game"""
         self.scoreboard.leaderboard.update_high_scores()
+        self.analytics.flush()
+        if self.spectator:
+            self.spectator.stop()
         sys.exit()
 
 
 class InputManager:
+    """
+    Dispatch pygame events to handlers through a lookup table keyed by
+    (game state, event type, key). Only the event types that have a handler
+    are allowed onto the event queue.
+    """
+    # the event attribute used as the third part of the handler key
+    key_attrs = {
+        pg.KEYDOWN: 'key',
+        pg.KEYUP: 'key',
+        pg.MOUSEBUTTONDOWN: 'button',
+        pg.MOUSEBUTTONUP: 'button',
+    }
+
     def __init__(self, game):
         self.game = game
         self.vars = game.vars
@@ -155,58 +409,111 @@ class InputManager:
         self.mouse_pos = 0, 0
         self.is_clicking = False
 
+        # time of each shot whose bullet has not been displayed yet, and the
+        # measured time from shot to display in milliseconds
+        self.pending_shots = []
+        self.delayed_shots = []
+        self.shot_latency = RollingStats(self.vars.latency_window)
+
+        self.handlers = self._build_handlers()
+        pg.event.set_blocked(None)
+        pg.event.set_allowed(
+            list({event_type for _, event_type, _ in self.handlers})
+        )
+
+    def _build_handlers(self):
+        """
+        Return the dispatch table. A state of None matches any game state,
+        a key of None is used for events without a key or button.
+        """
+        game = self.game
+        v = self.vars
+        return {
+            # quit via the x button or the quit key, menu and debug toggles
+            (None, pg.QUIT, None): game.quit_game,
+            (None, pg.KEYDOWN, v.key_quit): game.quit_game,
+            (None, pg.KEYDOWN, v.key_menu): game.toggle_menu,
+            (None, pg.KEYDOWN, v.key_toggle_debug): self._toggle_debug,
+            (None, pg.KEYDOWN, v.key_cycle_pacing): game.pacer.cycle_mode,
+            ('game', pg.KEYDOWN, v.key_quick_save): game.quick_save,
+            ('game', pg.KEYDOWN, v.key_quick_load): game.quick_load,
+            # throttle the game while it is in the background
+            (None, pg.WINDOWFOCUSLOST, None):
+                partial(game.pacer.set_focused, False),
+            (None, pg.WINDOWFOCUSGAINED, None):
+                partial(game.pacer.set_focused, True),
+            (None, pg.WINDOWMINIMIZED, None):
+                partial(game.pacer.set_minimized, True),
+            (None, pg.WINDOWRESTORED, None):
+                partial(game.pacer.set_minimized, False),
+            # left mouse button
+            (None, pg.MOUSEBUTTONDOWN, 1): partial(self._set_clicking, True),
+            (None, pg.MOUSEBUTTONUP, 1): partial(self._set_clicking, False),
+            # ship controls
+            ('game', pg.KEYDOWN, v.key_move_l): partial(self._move_left, True),
+            ('game', pg.KEYDOWN, v.key_move_r): partial(self._move_right, True),
+            ('game', pg.KEYDOWN, v.key_shoot): self._shoot,
+            ('game', pg.KEYUP, v.key_move_l): partial(self._move_left, False),
+            ('game', pg.KEYUP, v.key_move_r): partial(self._move_right, False),
+        }
+
     def check_events(self):
         """
-        First determine if the user has quit the game, then check events
-        for the game or menu depending on the current game state
+        Look up and call the handler of each event, handlers for the current
+        game state take priority over handlers for any state
         """
+        self.mouse_pos = self.game.to_screen_pos(pg.mouse.get_pos())
+
+        handlers = self.handlers
+        key_attrs = self.key_attrs
         for event in pg.event.get():
+            attr = key_attrs.get(event.type)
+            key = getattr(event, attr) if attr else None
 
-            # check for user quit via the x button
-            if event.type == pg.QUIT:
-                self.game.quit_game()
-            # check for user quit or menu toggle
-            elif event.type == pg.KEYDOWN:
-                if event.key == self.vars.key_quit:
-                    self.game.quit_game()
-                elif event.key == self.vars.key_menu:
-                    self.game.toggle_menu()
-                elif event.key == self.vars.key_toggle_debug:
-                    self.game.debug = False if self.game.debug else True
-
-            # update the mouse
-            self.mouse_pos = pg.mouse.get_pos()
-            if event.type == pg.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    self.is_clicking = True
-
-            elif event.type == pg.MOUSEBUTTONUP:
-                if event.button == 1:
-                    self.is_clicking = False
-
-            # check game events if in game
-            if self.game.state == 'game':
-                self._check_game_events(event)
-
-    def _check_game_events(self, event):
-        """Handle events that occur while the game in playing"""
-        if event.type == pg.KEYDOWN:
-            # ship controls
-            if event.key == self.vars.key_move_l:
-                self.game.ship.moving_left = True
-            elif event.key == self.vars.key_move_r:
-                self.game.ship.moving_right = True
-            elif event.key == self.vars.key_shoot:
-                self.game.ship.fire_bullet()
-
-        elif event.type == pg.KEYUP:
-            # ship controls
-            if event.key == self.vars.key_move_l:
-                self.game.ship.moving_left = False
-            elif event.key == self.vars.key_move_r:
-                self.game.ship.moving_right = False
+            handler = handlers.get((self.game.state, event.type, key)) \
+                or handlers.get((None, event.type, key))
+            if handler:
+                handler()
+
+    def frame_presented(self):
+        """
+        Called once a frame has been shown. Every bullet fired before this
+        frame is now on screen, so record the latency of each shot. In
+        pipelined mode a bullet fired this frame is only shown next frame.
+        """
+        if self.game.simulation:
+            # swap the lists, the emptied list is reused for the next frame
+            shown = self.delayed_shots
+            self.delayed_shots = self.pending_shots
+            self.pending_shots = shown
+        else:
+            shown = self.pending_shots
+
+        if shown:
+            now = perf_counter()
+            for shot_time in shown:
+                self.shot_latency.add((now - shot_time) * 1000)
+            shown.clear()
+
+    def _toggle_debug(self):
+        self.game.debug = not self.game.debug
+
+    def _set_clicking(self, is_clicking):
+        self.is_clicking = is_clicking
+
+    def _move_left(self, moving):
+        self.game.ship.moving_left = moving
+
+    def _move_right(self, moving):
+        self.game.ship.moving_right = moving
+
+    def _shoot(self):
+        """Fire a bullet, timing the shot if a bullet was actually fired"""
+        if self.game.ship.fire_bullet():
+            self.pending_shots.append(perf_counter())
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     ai = AlienInvasion()
     ai.run_game()
@@ -0,0 +1,177 @@
+"""
+Per-session gameplay analytics. While the game is played, one row is recorded
+per update into preallocated typed arrays, one array per column. Whenever
+the arrays fill up, and when the game quits, the rows are appended to the
+session's file under Vars.analytics_folder as a columnar block.
+
+Session file layout (little endian), a sequence of blocks:
+    header      magic b'AISA', format version, row count
+    columns     each column of COLUMNS in order, row count values each
+
+summarize() aggregates any number of session files with NumPy, e.g.
+    python analytics.py savedata/sessions
+"""
+from array import array
+from datetime import datetime
+import logging
+import os
+import struct
+import sys
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'AISA'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+
+# (name, array typecode, NumPy dtype) of every column, one row per update
+COLUMNS = (
+    ('frame_ms', 'f', '<f4'),        # time since the previous frame
+    ('shots', 'H', '<u2'),           # bullets fired
+    ('hits', 'H', '<u2'),            # aliens shot down
+    ('floor_contacts', 'H', '<u2'),  # aliens that reached the floor
+    ('ship_contacts', 'H', '<u2'),   # aliens that rammed the ship
+    ('score', 'i', '<i4'),           # score after the update
+)
+
+
+class SessionRecorder:
+    def __init__(self, game):
+        """
+        Preallocate the column arrays. Game code counts events straight into
+        the shots, hits, floor_contacts and ship_contacts attributes, and
+        record_frame() moves the counts into the next row.
+        """
+        self.game = game
+        self.vars = game.vars
+        self.enabled = self.vars.analytics
+
+        # events since the last recorded row
+        self.shots = 0
+        self.hits = 0
+        self.floor_contacts = 0
+        self.ship_contacts = 0
+
+        self.capacity = self.vars.analytics_capacity
+        self.columns = [
+            array(typecode, bytes(self.capacity * array(typecode).itemsize))
+            for _, typecode, _ in COLUMNS
+        ]
+        (self.frame_ms, self.shot_counts, self.hit_counts, self.floor_counts,
+         self.ship_counts, self.scores) = self.columns
+        self.rows = 0
+
+        self.path = os.path.join(
+            self.vars.analytics_folder,
+            datetime.now().strftime('%Y%m%d-%H%M%S') + f'-{os.getpid()}.bin'
+        )
+
+    def record_frame(self, frame_ms):
+        """Store the events of the last update as a row"""
+        if not self.enabled:
+            return
+        row = self.rows
+        self.frame_ms[row] = frame_ms
+        self.shot_counts[row] = self.shots
+        self.hit_counts[row] = self.hits
+        self.floor_counts[row] = self.floor_contacts
+        self.ship_counts[row] = self.ship_contacts
+        self.scores[row] = self.game.scoreboard.player_score
+        self.shots = self.hits = self.floor_contacts = self.ship_contacts = 0
+
+        self.rows += 1
+        if self.rows == self.capacity:
+            self.flush()
+
+    def flush(self):
+        """Append the recorded rows to the session file as one block"""
+        if not self.rows:
+            return
+        parts = [HEADER.pack(MAGIC, VERSION, self.rows)]
+        for column in self.columns:
+            values = column[:self.rows]
+            if sys.byteorder == 'big':
+                values.byteswap()
+            parts.append(values.tobytes())
+
+        os.makedirs(self.vars.analytics_folder, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(b''.join(parts))
+        logger.debug('wrote %d analytics rows to %s', self.rows, self.path)
+        self.rows = 0
+
+
+def read_session(path):
+    """
+    Return {column name: NumPy array} of every row in a session file. The
+    arrays are views into the file's bytes where the file has one block.
+    """
+    import numpy as np
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    blocks = {name: [] for name, _, _ in COLUMNS}
+    offset = 0
+    while offset < len(data):
+        magic, version, rows = HEADER.unpack_from(data, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a session file of this version')
+        offset += HEADER.size
+        for name, _, dtype in COLUMNS:
+            values = np.frombuffer(data, dtype, rows, offset)
+            blocks[name].append(values)
+            offset += values.nbytes
+
+    return {
+        name: parts[0] if len(parts) == 1 else np.concatenate(parts)
+        for name, parts in blocks.items()
+    }
+
+
+def summarize(paths, percentiles=(50, 95, 99)):
+    """
+    Aggregate session files. Returns a dict with the number of sessions,
+    frames and events, the accuracy (hits per shot), the kill rate (hits per
+    minute of play) and the frame time percentiles in ms.
+    """
+    import numpy as np
+
+    sessions = [read_session(path) for path in paths]
+    if not sessions:
+        return {'sessions': 0, 'frames': 0}
+    columns = {
+        name: np.concatenate([session[name] for session in sessions])
+        for name, _, _ in COLUMNS
+    }
+
+    # sum counts in a wide type, the columns are only 16 bit
+    totals = {
+        name: int(columns[name].sum(dtype=np.int64))
+        for name in ('shots', 'hits', 'floor_contacts', 'ship_contacts')
+    }
+    frame_ms = columns['frame_ms']
+    minutes = float(frame_ms.sum(dtype=np.float64)) / 60000
+
+    return {
+        'sessions': len(sessions),
+        'frames': len(frame_ms),
+        **totals,
+        'accuracy': totals['hits'] / totals['shots'] if totals['shots'] else 0.0,
+        'kills_per_minute': totals['hits'] / minutes if minutes else 0.0,
+        'frame_ms': dict(zip(
+            (f'p{p}' for p in percentiles),
+            np.percentile(frame_ms, percentiles).tolist()
+        )) if len(frame_ms) else {},
+        'best_score': int(columns['score'].max(initial=0)),
+    }
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else 'savedata/sessions/'
+    files = sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.endswith('.bin')
+    )
+    for key, value in summarize(files).items():
+        print(f'{key}: {value}')
@@ -0,0 +1,236 @@
+"""
+Packed asset archive. Every runtime asset (images, fonts, waves and sounds)
+can be packed into one indexed file:
+
+    python assets.py build
+
+At startup the archive is memory-mapped once and each asset is handed out as
+a read-only file-like view over its slice of the map, so pg.image.load and
+Font read from the mapping without another file open. Reads copy straight
+from the map into the decoder's buffer, an asset is never read into a bytes
+object first.
+
+Without an archive the same functions fall back to the loose files, so the
+game also runs from a fresh checkout. The archive is checked once when it is
+opened: if any asset folder or single asset file is newer than the archive,
+files were added, removed or replaced since it was built, so it is ignored
+with a warning and the loose files are used. A current archive serves every
+listing and asset without touching the loose files. Editing a file in place
+does not change its folder's time, rebuild the archive after such edits.
+
+Layout (little endian):
+    header      magic b'AIPK', format version, entry count
+    index       per entry: path length (H), UTF-8 path, offset (Q), size (Q)
+    data        the asset bytes, offsets are from the start of the file
+Paths use '/' and the index is sorted, so listings are the same everywhere.
+"""
+import io
+import logging
+import mmap
+import os
+import struct
+import sys
+
+import pygame as pg
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATH = 'assets.pak'
+# folders packed into the archive, relative to the game folder
+ASSET_FOLDERS = ('images/alien_ships', 'images/asteroids', 'fonts', 'waves',
+                 'sounds')
+# single files packed into the archive
+ASSET_FILES = ('images/bg.bmp', 'images/ship1.bmp')
+
+MAGIC = b'AIPK'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+PATH_LENGTH = struct.Struct('<H')
+ENTRY = struct.Struct('<QQ')
+
+# the open archive, None when running from loose files. Opened on first use
+_archive = None
+_checked = False
+
+
+class AssetView(io.RawIOBase):
+    """A read-only, seekable file over a slice of the archive's memory map"""
+    def __init__(self, view, name):
+        self.view = view
+        self.name = name
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self.view) - self.position)
+        if count <= 0:
+            return 0
+        buffer[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+class Archive:
+    """A memory-mapped asset archive"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # loose assets changed after this are newer than their entries
+            self.mtime = os.fstat(f.fileno()).st_mtime
+        self.view = memoryview(self.map)
+        # path: (offset, size)
+        self.index = {}
+        self._read_index()
+
+    def _read_index(self):
+        magic, version, count = HEADER.unpack_from(self.view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not an asset archive of this version')
+        offset = HEADER.size
+        for _ in range(count):
+            length, = PATH_LENGTH.unpack_from(self.view, offset)
+            offset += PATH_LENGTH.size
+            path = bytes(self.view[offset:offset + length]).decode('utf-8')
+            offset += length
+            self.index[path] = ENTRY.unpack_from(self.view, offset)
+            offset += ENTRY.size
+
+    def open(self, path):
+        """Return a file-like view of an asset, KeyError if it is missing"""
+        start, size = self.index[path]
+        return AssetView(self.view[start:start + size], path)
+
+    def is_stale(self):
+        """
+        Return True if an asset folder or single asset file changed after the
+        archive was built. One stat per folder and file, the folders' own
+        times change whenever a file in them is added, removed or replaced.
+        """
+        for path in ASSET_FOLDERS + ASSET_FILES:
+            try:
+                if os.stat(path).st_mtime > self.mtime:
+                    return True
+            except OSError:
+                pass
+        return False
+
+    def list(self, folder):
+        """Return the sorted file names directly inside folder"""
+        prefix = folder + '/'
+        return sorted(
+            path[len(prefix):] for path in self.index
+            if path.startswith(prefix) and '/' not in path[len(prefix):]
+        )
+
+
+def _normalize(path):
+    """Archive paths use '/' and never start or end with one"""
+    return path.replace(os.sep, '/').strip('/')
+
+
+def get_archive():
+    """Return the open archive, or None to use loose files"""
+    global _archive, _checked
+    if not _checked:
+        _checked = True
+        if os.path.exists(ARCHIVE_PATH):
+            try:
+                _archive = Archive(ARCHIVE_PATH)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning('ignoring asset archive: %s', e)
+            else:
+                if _archive.is_stale():
+                    logger.warning('ignoring %s, the assets changed since it '
+                                   'was built. Run: python assets.py build',
+                                   ARCHIVE_PATH)
+                    _archive = None
+                else:
+                    logger.info('loaded %d assets from %s',
+                                len(_archive.index), ARCHIVE_PATH)
+    return _archive
+
+
+def open_asset(path):
+    """Return a readable binary file for an asset"""
+    archive = get_archive()
+    if archive:
+        try:
+            return archive.open(_normalize(path))
+        except KeyError:
+            pass
+    return open(path, 'rb')
+
+
+def list_assets(folder):
+    """Return the sorted file names in an asset folder, [] if it is missing"""
+    archive = get_archive()
+    if archive:
+        names = archive.list(_normalize(folder))
+        if names:
+            return names
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.listdir(folder))
+
+
+def load_image(path):
+    """pg.image.load an asset, the path doubles as the file type hint"""
+    return pg.image.load(open_asset(path), path)
+
+
+def load_font(path, size):
+    """Return a pg.font.Font of an asset"""
+    return pg.font.Font(open_asset(path), size)
+
+
+def build(path=ARCHIVE_PATH):
+    """Pack every asset into an archive at path"""
+    paths = list(ASSET_FILES)
+    for folder in ASSET_FOLDERS:
+        if os.path.isdir(folder):
+            paths.extend(f'{folder}/{name}' for name in os.listdir(folder)
+                         if os.path.isfile(os.path.join(folder, name)))
+    paths.sort()
+
+    blobs = []
+    for asset in paths:
+        with open(asset, 'rb') as f:
+            blobs.append(f.read())
+
+    encoded = [asset.encode('utf-8') for asset in paths]
+    offset = HEADER.size + sum(
+        PATH_LENGTH.size + len(name) + ENTRY.size for name in encoded
+    )
+    parts = [HEADER.pack(MAGIC, VERSION, len(paths))]
+    for name, blob in zip(encoded, blobs):
+        parts.append(PATH_LENGTH.pack(len(name)) + name
+                     + ENTRY.pack(offset, len(blob)))
+        offset += len(blob)
+    parts.extend(blobs)
+
+    with open(path, 'wb') as f:
+        f.write(b''.join(parts))
+    return len(paths), offset
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        sys.exit('usage: python assets.py build')
+    count, size = build()
+    print(f'packed {count} assets, {size} bytes, into {ARCHIVE_PATH}')
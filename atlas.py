@@ -0,0 +1,45 @@
+"""
+Runtime texture atlas. A sprite pool's images are packed into one surface at
+load time, and the pool hands out subsurfaces of it. Groups that draw
+unrotated pool images submit (atlas surface, dest, area) blits, so a whole
+layer reads from a single source surface.
+"""
+import pygame as pg
+
+
+class TextureAtlas:
+    """
+    Shelf packed atlas: images are placed tallest first, left to right, in
+    rows (shelves) as tall as their first image. rects[i] is the area of
+    surfaces[i] in the atlas and frames[i] a subsurface over it.
+    """
+    def __init__(self, surfaces, max_width=1024, padding=1):
+        self.padding = padding
+        self.rects = self._pack([surf.get_size() for surf in surfaces],
+                                max_width)
+
+        size = (max(rect.right for rect in self.rects),
+                max(rect.bottom for rect in self.rects))
+        self.surface = pg.Surface(size, flags=pg.SRCALPHA).convert_alpha()
+        self.surface.fill((0, 0, 0, 0))
+        for surf, rect in zip(surfaces, self.rects):
+            # onto transparent black, MAX copies every channel unblended
+            self.surface.blit(surf, rect, special_flags=pg.BLEND_RGBA_MAX)
+
+        self.frames = [self.surface.subsurface(rect) for rect in self.rects]
+
+    def _pack(self, sizes, max_width):
+        """Return a rect for each size, in the order of sizes"""
+        max_width = max(max_width, max(w for w, _ in sizes))
+        rects = [None] * len(sizes)
+        x = y = shelf_h = 0
+        for index in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+            w, h = sizes[index]
+            if x and x + w > max_width:
+                # start a new shelf below the current one
+                y += shelf_h + self.padding
+                x = shelf_h = 0
+            rects[index] = pg.Rect(x, y, w, h)
+            x += w + self.padding
+            shelf_h = max(shelf_h, h)
+        return rects
@@ -0,0 +1,166 @@
+"""
+Debug overlay for game mode, toggled with Vars.key_toggle_debug. Draws the
+rect of every entity, a line between each bullet and the alien it hit, and a
+panel with entity counts, blit counts per layer, the number of collision
+pairs left by the broadphase, the time each world system took and the hit
+rates of the surface caches.
+
+The overlay is drawn onto its own colorkeyed, screen-sized surface that is
+kept between frames: only the rects drawn on the previous frame are erased,
+and the panel is re-rendered a few times per second. Nothing here runs while
+the overlay is off.
+
+Like the rest of the game, the overlay reads the sprites only where they are
+submitted: collect() runs with submit_snapshot (on the simulation thread when
+pipelined) and copies the rects, hit lines and game stats into the render
+frame. submit() then draws from that copy on the main thread.
+"""
+from time import perf_counter
+
+import pygame as pg
+
+from render import LAYER_DEBUG, LAYER_NAMES
+
+
+class DebugOverlay:
+    def __init__(self, game):
+        self.game = game
+        self.vars = game.vars
+        self.font = self.vars.debug_font
+        self.font_rgb = self.vars.debug_font_rgb
+
+        self.surface = pg.Surface(game.rect.size).convert()
+        self.surface.fill(self.vars.black_rgb)
+        self.surface.set_colorkey(self.vars.black_rgb)
+        # everything drawn on the surface last frame, erased before redrawing
+        self.dirty = []
+
+        # (bullet center, alien center, time shown until) of recent hits
+        self.hit_lines = []
+
+        self.panel = pg.Surface((0, 0))
+        self.panel_pos = (0, 0)
+        self.refresh_ms = 1000 / self.vars.debug_refresh_rate
+        self.idle_time = self.refresh_ms
+
+    def add_hits(self, collisions):
+        """Keep the bullet to alien lines of a collide result"""
+        until = perf_counter() + self.vars.debug_hit_hold
+        for bullet, aliens in collisions.items():
+            for alien in aliens:
+                self.hit_lines.append(
+                    (bullet.rect.center, alien.rect.center, until)
+                )
+
+    def collect(self, frame):
+        """
+        Copy what the overlay shows of the game into a render frame, as
+        frame.debug. Called where the game is submitted, so the sprites are
+        never read while they are updated.
+        """
+        game = self.game
+        groups = (
+            (game.asteroids, self.vars.grey_rgb),
+            (game.alien_fleet, self.vars.light_blue_rgb),
+            (game.ship.bullets, self.vars.yellow_rgb),
+        )
+        rects = [(color, tuple(sprite.rect))
+                 for group, color in groups for sprite in group.sprites()]
+        rects.append((self.vars.green_rgb, tuple(game.ship.rect)))
+
+        now = perf_counter()
+        self.hit_lines = [line for line in self.hit_lines if line[2] > now]
+
+        # the game side of the panel, only when it is due for a refresh
+        lines = None
+        self.idle_time += game.clock.get_time()
+        if self.idle_time >= self.refresh_ms:
+            self.idle_time = 0
+            lines = self._game_lines()
+
+        frame.debug = (rects, list(self.hit_lines), lines)
+
+    def submit(self, frame, debug):
+        """
+        Redraw the overlay from the debug data of a frame made by collect()
+        and submit it above the game
+        """
+        if debug is None:
+            return
+        rects, hit_lines, lines = debug
+        self._draw_rects(rects, hit_lines)
+        frame.submit(LAYER_DEBUG, self.surface, (0, 0))
+
+        if lines is not None:
+            self._render_panel(lines)
+        frame.submit(LAYER_DEBUG, self.panel, self.panel_pos)
+
+    def _draw_rects(self, rects, hit_lines):
+        """Erase last frame's rects and lines, then draw the current ones"""
+        surf = self.surface
+        black = self.vars.black_rgb
+        for rect in self.dirty:
+            surf.fill(black, rect)
+
+        dirty = [pg.draw.rect(surf, color, rect, 1) for color, rect in rects]
+        for start, end, _ in hit_lines:
+            dirty.append(pg.draw.line(surf, self.vars.white_rgb, start, end))
+        self.dirty = dirty
+
+    def _game_lines(self):
+        """
+        Return the panel lines about the game objects and clear the game's
+        cache counters
+        """
+        game = self.game
+        caches = (
+            ('spin', game.asteroids.spin_stats),
+            ('score text', game.scoreboard.text_stats),
+        )
+        lines = [
+            f'aliens {len(game.alien_fleet)}  bullets {len(game.ship.bullets)}'
+            f'  asteroids {len(game.asteroids)}',
+            f'collision pairs {game.world.collision_pairs}',
+            'systems  ' + '  '.join(
+                f'{name} {ms:.2f}' for name, ms in game.world.timings.items()
+            ),
+            '  '.join(f'{name} {stats.hit_rate:.0%}' for name, stats in caches),
+        ]
+        for _, stats in caches:
+            stats.clear()
+        return lines
+
+    def _render_panel(self, game_lines):
+        """
+        Render the stats panel from the game's lines and the render queue's
+        stats, then clear the render queue's cache counters
+        """
+        game = self.game
+        render = game.render
+        *game_lines, game_caches = game_lines
+
+        layers = '  '.join(
+            f'{name} {count}'
+            for name, count in zip(LAYER_NAMES, render.draw_counts) if count
+        )
+        lines = (
+            *game_lines,
+            f'blits {sum(render.draw_counts)}  '
+            f'draw {sum(render.timings):.2f} ms',
+            layers,
+            f'cache hits  static {render.static_stats.hit_rate:.0%}  '
+            + game_caches,
+        )
+        render.static_stats.clear()
+
+        rendered = [self.font.render(line, True, self.font_rgb)
+                    for line in lines]
+        line_h = self.font.get_linesize()
+        width = max(surf.get_width() for surf in rendered)
+        panel = pg.Surface((width + 8, line_h * len(rendered) + 8),
+                           flags=pg.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        for i, surf in enumerate(rendered):
+            panel.blit(surf, (4, 4 + i * line_h))
+        self.panel = panel
+        self.panel_pos = (0, game.rect.bottom - panel.get_height())
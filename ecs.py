@@ -0,0 +1,292 @@
+"""
+Entity component system core. Entities of one kind live in an Archetype: a
+table with one flat array per component and one row per entity. Systems are
+functions that run over the component arrays of every archetype that has
+the components they need. The World runs them in order once per update and
+times each one, so there is a single place to profile (see the debug
+overlay) and to batch new entity types.
+
+Sprites are views: each entity is still a pygame sprite, holding its table
+and row and reading its state from the table through component_property(),
+so groups, collision callbacks, snapshots and observers keep working. The
+sync_rects system moves the sprites' rects to their table positions.
+
+Only bullets are stored here, they are the entities that are spawned and
+despawned in numbers. Asteroids, aliens and the ship update themselves: a
+table bought them nothing but an indirection on every attribute.
+
+The columns are stdlib arrays and the systems plain loops. With tables of a
+few dozen rows the per call overhead of NumPy cost more than vectorizing
+saved, the whole update was slower than the sprites updating themselves.
+"""
+from array import array
+from time import perf_counter
+
+# component name: (array typecode, values per entity)
+COMPONENTS = {
+    'position': ('d', 2),     # x and y of the rect's topleft
+    'velocity': ('d', 2),     # pixels per second
+    'image_index': ('H', 1),  # index into the owner's image list
+    'lifetime': ('d', 1),     # seconds left before despawning
+    'collider': ('i', 2),     # width and height of the hit box
+}
+
+
+class Archetype:
+    """
+    A table of entities sharing the same components. Rows [0, count) are
+    live. Removing a row swaps it with the last live row, so the removed
+    entity's data is kept just past count; pools use set_count() to switch
+    such rows back on. A component of width values keeps the values of row
+    at [row * width, row * width + width) of its column.
+    """
+    def __init__(self, name, components, capacity=16,
+                 remove_offscreen=False, prev_rect=False):
+        self.name = name
+        # the entities keep their rect from before the last sync in
+        # prev_rect, for swept collision
+        self.prev_rect = prev_rect
+        # despawn entities whose box has left the screen, see bounds()
+        self.remove_offscreen = remove_offscreen
+
+        self.capacity = capacity
+        self.count = 0
+        self.columns = {}
+        self.widths = {}
+        for component in components:
+            typecode, width = COMPONENTS[component]
+            self.columns[component] = array(typecode, [0]) * (capacity * width)
+            self.widths[component] = width
+        # the sprite viewing each row
+        self.entities = []
+
+    def __contains__(self, component):
+        return component in self.columns
+
+    def __len__(self):
+        return self.count
+
+    def add(self, entity, **values):
+        """Append an entity, returns its row. Sets entity.table and row"""
+        if self.count == self.capacity:
+            self._grow()
+        row = self.count
+        for component, value in values.items():
+            values_of = self.columns[component]
+            width = self.widths[component]
+            if width == 1:
+                values_of[row] = value
+            else:
+                for k in range(width):
+                    values_of[row * width + k] = value[k]
+
+        entity.table = self
+        entity.row = row
+        if row < len(self.entities):
+            self.entities[row] = entity
+        else:
+            self.entities.append(entity)
+        self.count += 1
+        return row
+
+    def despawn(self, row):
+        """Remove an entity from its groups and from the live rows"""
+        entity = self.entities[row]
+        entity.kill()
+        last = self.count - 1
+        if row != last:
+            for component, values in self.columns.items():
+                width = self.widths[component]
+                a, b = row * width, last * width
+                for k in range(width):
+                    values[a + k], values[b + k] = values[b + k], values[a + k]
+            moved = self.entities[last]
+            self.entities[row], self.entities[last] = moved, entity
+            moved.row, entity.row = row, last
+        self.count -= 1
+
+    def set_count(self, count):
+        """Make the first count rows live, later rows keep their data"""
+        self.count = count
+
+    def clear(self):
+        """Drop every entity"""
+        self.count = 0
+        self.entities.clear()
+
+    def _grow(self):
+        """Double the capacity of every component array"""
+        for component, values in self.columns.items():
+            values.extend(array(values.typecode, [0])
+                          * (self.capacity * self.widths[component]))
+        self.capacity *= 2
+
+
+def component_property(component, index=None, cast=float):
+    """
+    Property of a view sprite reading and writing its row of a component.
+    index picks one value of a multi-value component, e.g. 0 for x.
+    """
+    if index is None:
+        def getter(self):
+            return cast(self.table.columns[component][self.row])
+
+        def setter(self, value):
+            self.table.columns[component][self.row] = value
+    else:
+        width = COMPONENTS[component][1]
+
+        def getter(self):
+            return cast(
+                self.table.columns[component][self.row * width + index]
+            )
+
+        def setter(self, value):
+            self.table.columns[component][self.row * width + index] = value
+
+    return property(getter, setter)
+
+
+class World:
+    """The archetype tables and the systems that update them"""
+    def __init__(self, size):
+        self.w, self.h = size
+        self.tables = {}
+        # (name, system) in the order they run
+        self.systems = []
+        # ms each system took in the last update
+        self.timings = {}
+        # broadphase pairs found by the last collide()
+        self.collision_pairs = 0
+        # with_components() results, tables are only added at startup
+        self._matches = {}
+
+    def add_table(self, table):
+        self.tables[table.name] = table
+        self._matches.clear()
+        return table
+
+    def add_system(self, name, system):
+        """Run system(world, dt) on every update, after those added before"""
+        self.systems.append((name, system))
+        self.timings[name] = 0.0
+
+    def with_components(self, *components):
+        """Return the tables that have every one of the components"""
+        matches = self._matches.get(components)
+        if matches is None:
+            matches = self._matches[components] = [
+                table for table in self.tables.values()
+                if all(component in table for component in components)
+            ]
+        return matches
+
+    def update(self, dt):
+        """Run every system once"""
+        for name, system in self.systems:
+            start = perf_counter()
+            system(self, dt)
+            self.timings[name] = (perf_counter() - start) * 1000
+
+    def collide(self, table, sprites, collided):
+        """
+        Collide the entities of a table with a list of sprites, like
+        pg.sprite.groupcollide. The swept boxes (rect and prev_rect) of every
+        pair are compared first, collided(entity, sprite) only runs for the
+        pairs that overlap. Returns {entity: [sprites it collided with]}.
+        """
+        count = table.count
+        if not count or not sprites:
+            self.collision_pairs = 0
+            return {}
+
+        targets = list(zip(_swept_boxes(sprites), sprites))
+        pairs = 0
+        collisions = {}
+        for entity in table.entities[:count]:
+            rect, prev = entity.rect, entity.prev_rect
+            left, top = min(rect.x, prev.x), min(rect.y, prev.y)
+            right = max(rect.right, prev.right)
+            bottom = max(rect.bottom, prev.bottom)
+            for (b_left, b_top, b_right, b_bottom), sprite in targets:
+                if (left < b_right and right > b_left
+                        and top < b_bottom and bottom > b_top):
+                    pairs += 1
+                    if collided(entity, sprite):
+                        collisions.setdefault(entity, []).append(sprite)
+        self.collision_pairs = pairs
+        return collisions
+
+
+def _swept_boxes(sprites):
+    """Return (left, top, right, bottom) around each rect and prev_rect"""
+    return [
+        (min(rect.x, prev.x), min(rect.y, prev.y),
+         max(rect.right, prev.right), max(rect.bottom, prev.bottom))
+        for rect, prev in ((s.rect, s.prev_rect) for s in sprites)
+    ]
+
+
+# systems, each runs over the component arrays of its tables
+
+def movement(world, dt):
+    """Move every entity by its velocity"""
+    for table in world.with_components('position', 'velocity'):
+        position = table.columns['position']
+        velocity = table.columns['velocity']
+        for i in range(2 * table.count):
+            position[i] += velocity[i] * dt
+
+
+def expire(world, dt):
+    """Count lifetimes down and despawn the entities whose time is up"""
+    for table in world.with_components('lifetime'):
+        lifetime = table.columns['lifetime']
+        # highest rows first, a despawn only moves rows above the removed one
+        for row in range(table.count - 1, -1, -1):
+            lifetime[row] -= dt
+            if lifetime[row] <= 0:
+                table.despawn(row)
+
+
+def bounds(world, dt):
+    """Despawn the entities of remove_offscreen tables that left the screen"""
+    w, h = world.w, world.h
+    for table in world.with_components('position', 'collider'):
+        if not table.remove_offscreen:
+            continue
+        position = table.columns['position']
+        size = table.columns['collider']
+        for row in range(table.count - 1, -1, -1):
+            x, y = position[2 * row], position[2 * row + 1]
+            if (x + size[2 * row] <= 0 or x >= w
+                    or y + size[2 * row + 1] <= 0 or y >= h):
+                table.despawn(row)
+
+
+def sync_rects(world, dt):
+    """
+    Move each sprite's rect to its table position. In prev_rect tables the
+    sprites keep the rect they had before, for swept collision.
+    """
+    for table in world.with_components('position'):
+        position = table.columns['position']
+        keep_prev = table.prev_rect
+        for row, entity in enumerate(table.entities[:table.count]):
+            rect = entity.rect
+            if keep_prev:
+                entity.prev_rect.update(rect)
+            rect.x = position[2 * row]
+            rect.y = position[2 * row + 1]
+
+
+def render(table, images):
+    """
+    Return a blit sequence drawing each entity of a table as
+    images[image_index] at its rect
+    """
+    return [
+        (images[index], entity.rect.topleft)
+        for entity, index in zip(table.entities[:table.count],
+                                 table.columns['image_index'])
+    ]
@@ -0,0 +1,235 @@
+"""
+Gym-style environment around a headless game, for automated play and agent
+training. Requires NumPy.
+
+    env = AlienInvasionEnv(obs_type='state')
+    obs, info = env.reset(seed=1)
+    obs, reward, terminated, truncated, info = env.step(env.FIRE)
+
+Observations are never copied. 'state' observations are a preallocated
+float32 array that is filled in place on each step, 'pixels' observations
+are a (height, width, 3) uint8 view of the pixels the game draws into. Both
+stay valid until the next step or reset; copy them to keep them longer.
+
+VectorAlienInvasionEnv steps many environments at once, their observations
+are rows of one batch array.
+"""
+import os
+
+import numpy as np
+import pygame as pg
+
+# a headless game must not open a window or an audio device
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from alien_invasion import AlienInvasion  # noqa: E402
+import settings  # noqa: E402
+
+# entity kinds in state observations, 0 marks an empty row
+KIND_SHIP = 1
+KIND_BULLET = 2
+KIND_ALIEN = 3
+KIND_ASTEROID = 4
+
+# rows reserved for aliens in a state observation
+MAX_ALIENS = 64
+# state observation columns: kind, center x, center y (both 0 - 1)
+STATE_COLUMNS = 3
+
+
+class AlienInvasionEnv:
+    # actions
+    NOOP, LEFT, RIGHT, FIRE, LEFT_FIRE, RIGHT_FIRE = range(6)
+    num_actions = 6
+
+    def __init__(self, obs_type='state', render_h=84, dt=1 / 60,
+                 frame_skip=1, max_steps=10000, obs_buffer=None,
+                 pixel_buffer=None):
+        """
+        obs_type: 'state' or 'pixels'
+        render_h: height of the game screen in pixels, the width follows the
+            aspect ratio of the window the game would have opened
+        dt: simulated seconds per frame
+        frame_skip: frames simulated per step, the action is held for all
+        obs_buffer / pixel_buffer: optional preallocated arrays to fill, used
+            by VectorAlienInvasionEnv
+        """
+        if obs_type not in ('state', 'pixels'):
+            raise ValueError(f'unknown obs_type {obs_type!r}')
+        self.obs_type = obs_type
+        self.dt = dt
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+
+        self.game = AlienInvasion(headless=True, render_h=render_h,
+                                  pixel_buffer=pixel_buffer)
+        self.game.state = 'game'
+        self.game.vars.show_fps = False
+        # agent runs are not play sessions
+        self.game.analytics.enabled = False
+        width, height = self.game.rect.size
+
+        # zero copy view of the game's RGBX pixels
+        self.pixels = np.frombuffer(
+            self.game.pixel_buffer, dtype=np.uint8
+        ).reshape(height, width, 4)[:, :, :3]
+
+        self.max_entities = (1 + self.game.vars.max_bullets + MAX_ALIENS
+                             + self.game.vars.num_asteroids)
+        if obs_buffer is None:
+            obs_buffer = np.zeros((self.max_entities, STATE_COLUMNS),
+                                  dtype=np.float32)
+        self.state = obs_buffer
+
+        self.steps = 0
+        self.last_score = 0
+
+    @property
+    def observation_shape(self):
+        if self.obs_type == 'pixels':
+            return self.pixels.shape
+        return self.state.shape
+
+    def reset(self, seed=None):
+        """Start a new game, returns (observation, info)"""
+        self.game.new_game(seed)
+        self.steps = 0
+        self.last_score = 0
+        return self._observe(), self._info()
+
+    def step(self, action):
+        """
+        Apply an action for frame_skip frames. Returns (observation, reward,
+        terminated, truncated, info). The reward is the score gained, the
+        episode ends when an alien hits the ship or reaches the floor.
+        """
+        game = self.game
+        ship = game.ship
+        ship.moving_left = action in (self.LEFT, self.LEFT_FIRE)
+        ship.moving_right = action in (self.RIGHT, self.RIGHT_FIRE)
+        if action in (self.FIRE, self.LEFT_FIRE, self.RIGHT_FIRE):
+            ship.fire_bullet()
+
+        for _ in range(self.frame_skip):
+            game._update_game(self.dt)
+        self.steps += 1
+
+        score = game.scoreboard.player_score
+        reward = score - self.last_score
+        self.last_score = score
+
+        fleet = game.alien_fleet
+        terminated = fleet.ship_contacts > 0 or fleet.floor_contacts > 0
+        truncated = self.steps >= self.max_steps
+        return self._observe(), reward, terminated, truncated, self._info()
+
+    def close(self):
+        pass
+
+    def _observe(self):
+        if self.obs_type == 'pixels':
+            self.game._draw_screen()
+            return self.pixels
+        self._fill_state()
+        return self.state
+
+    def _fill_state(self):
+        """Write every entity into the state array, clearing unused rows"""
+        state = self.state
+        game = self.game
+        width, height = game.rect.size
+        row = 0
+
+        def put(kind, rect):
+            nonlocal row
+            if row < self.max_entities:
+                state[row] = kind, rect.centerx / width, rect.centery / height
+                row += 1
+
+        put(KIND_SHIP, game.ship.rect)
+        for bullet in game.ship.bullets:
+            put(KIND_BULLET, bullet.rect)
+        for alien in game.alien_fleet:
+            put(KIND_ALIEN, alien.rect)
+        for asteroid in game.asteroids:
+            put(KIND_ASTEROID, asteroid.rect)
+        state[row:] = 0
+
+    def _info(self):
+        fleet = self.game.alien_fleet
+        return {
+            'score': self.game.scoreboard.player_score,
+            'wave': fleet.wave_index,
+            'aliens': len(fleet),
+            'steps': self.steps,
+        }
+
+
+class VectorAlienInvasionEnv:
+    """
+    Steps num_envs environments in a batch. Observations of all environments
+    live in one batch array, each environment writes into its own row, so
+    batching copies nothing. Finished environments are reset automatically,
+    their final info is kept under 'final_info'.
+    """
+    def __init__(self, num_envs, obs_type='state', render_h=84, **kwargs):
+        self.num_envs = num_envs
+
+        # the settings give the observation size before any game exists
+        pg.init()
+        game_vars = settings.Vars(render_h)
+        if obs_type == 'pixels':
+            self.pixel_batch = np.zeros(
+                (num_envs, game_vars.screen_h, game_vars.screen_w, 4),
+                dtype=np.uint8
+            )
+            self.observations = self.pixel_batch[..., :3]
+        else:
+            max_entities = (1 + game_vars.max_bullets + MAX_ALIENS
+                            + game_vars.num_asteroids)
+            self.observations = np.zeros(
+                (num_envs, max_entities, STATE_COLUMNS), dtype=np.float32
+            )
+
+        self.envs = []
+        for i in range(num_envs):
+            if obs_type == 'pixels':
+                buffers = {'pixel_buffer': self.pixel_batch[i]}
+            else:
+                buffers = {'obs_buffer': self.observations[i]}
+            self.envs.append(AlienInvasionEnv(
+                obs_type, render_h=render_h, **buffers, **kwargs
+            ))
+
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+
+    def reset(self, seed=None):
+        """Reset every environment, seeds are seed, seed + 1, ..."""
+        infos = []
+        for i, env in enumerate(self.envs):
+            _, info = env.reset(None if seed is None else seed + i)
+            infos.append(info)
+        return self.observations, infos
+
+    def step(self, actions):
+        """Step each environment with its action, returns batched results"""
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            _, reward, terminated, truncated, info = env.step(action)
+            self.rewards[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            if terminated or truncated:
+                _, reset_info = env.reset()
+                reset_info['final_info'] = info
+                info = reset_info
+            infos.append(info)
+        return (self.observations, self.rewards, self.terminated,
+                self.truncated, infos)
+
+    def close(self):
+        for env in self.envs:
+            env.close()
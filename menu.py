@@ -9,6 +9,8 @@ import pygame as pg
 from pygame.sprite import Sprite, Group
 from pygame.rect import Rect
 
+from render import LAYER_MENU_BG, LAYER_MENU
+
 
 class MenuManager:
     def __init__(self, game):
@@ -25,8 +27,8 @@ class MenuManager:
     def update_menu(self):
         self.curr_menu.update()
 
-    def draw_menu(self):
-        self.curr_menu.blit_menu()
+    def submit_menu(self, frame):
+        self.curr_menu.submit(frame)
 
 
 class MenuTemplate:
@@ -108,17 +110,32 @@ class MenuTemplate:
         for area in self.menu_areas:
             area.update()
 
-    def blit_menu(self):
-        """Blit the menu to the game screen"""
+    def submit(self, frame):
+        """
+        Submit the menu to the render frame. The background (and the debug
+        layout rects) are static, the buttons are submitted every frame.
+        """
         if self.game.debug:
-            pg.draw.rect(self.game.screen, (0,0,0), self.center_group.rect)
-            pg.draw.rect(self.game.screen, (0,0,0), self.bottom_l_group.rect)
-            pg.draw.rect(self.game.screen, (0,0,0), self.bottom_r_group.rect)
+            frame.submit_static(
+                LAYER_MENU_BG, 'menu_debug', self._render_debug_rects
+            )
+        frame.submit_static(
+            LAYER_MENU_BG, 'menu_bg', lambda: ((self.image, self.rect),)
+        )
 
         for area in self.menu_areas:
-            area.draw(self.image)
-
-        self.game.screen.blit(self.image, self.rect)
+            frame.submit_many(
+                LAYER_MENU, [(sprite.image, sprite.rect) for sprite in area]
+            )
+
+    def _render_debug_rects(self):
+        """Return black surfaces covering the layout areas as blits"""
+        blits = []
+        for area in (self.center_group, self.bottom_l_group,
+                     self.bottom_r_group):
+            surf = pg.Surface(area.rect.size)
+            blits.append((surf, area.rect))
+        return blits
 
     class MenuArea(Group):
         """
@@ -188,7 +205,6 @@ class Button(Sprite):
         function"""
         mouse_pos = self.menu.input_manager.mouse_pos
         mouse_is_clicking = self.menu.input_manager.is_clicking
-        print(mouse_pos)
         if self.rect.collidepoint(mouse_pos):
             self.mouse_over = True
         else:
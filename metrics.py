@@ -0,0 +1,72 @@
+"""Small helpers for collecting runtime statistics such as frame times"""
+from collections import deque
+import math
+
+
+class RollingStats:
+    """
+    Keep the last 'size' samples of a measurement and provide summary
+    statistics over them. The running sum is kept so the mean is cheap to
+    read every frame.
+    """
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.total = 0.0
+
+    def add(self, value):
+        """Add a sample, dropping the oldest one if the window is full"""
+        if len(self.samples) == self.samples.maxlen:
+            self.total -= self.samples[0]
+        self.samples.append(value)
+        self.total += value
+
+    def clear(self):
+        self.samples.clear()
+        self.total = 0.0
+
+    @property
+    def full(self):
+        return len(self.samples) == self.samples.maxlen
+
+    @property
+    def mean(self):
+        if not self.samples:
+            return 0.0
+        return self.total / len(self.samples)
+
+    @property
+    def stdev(self):
+        if len(self.samples) < 2:
+            return 0.0
+        mean = self.mean
+        return math.sqrt(
+            sum((x - mean) ** 2 for x in self.samples) / (len(self.samples) - 1)
+        )
+
+    def percentile(self, pct):
+        """Return the sample at the given percentile (0 - 100)"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(pct / 100 * len(ordered)))
+        return ordered[index]
+
+
+class CacheStats:
+    """
+    Hit and miss counts of a cache. The owner of the cache increments the
+    counters directly, readers clear them to start a new measurement.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
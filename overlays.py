@@ -2,6 +2,9 @@ import pygame as pg
 from os.path import join
 
 import leaderboard
+from assets import load_font
+from metrics import CacheStats
+from render import LAYER_SCOREBOARD, LAYER_SCORE, LAYER_HUD
 
 
 class Scoreboard:
@@ -17,7 +20,7 @@ class Scoreboard:
         # style info
         self.width = game.rect.w * .25
         self.height = game.rect.h * .08
-        self.font = pg.font.Font(join('fonts/', 'arcade.ttf'), 30)
+        self.font = load_font(join('fonts/', 'arcade.ttf'), 30)
         self.font_color = game.vars.scoreboard_font_rgba
         self.board_rgba = *game.vars.olive_rgb, 128
 
@@ -28,27 +31,45 @@ class Scoreboard:
 
         # initialize surfaces and rects for elements that don't change
         self.rendered_scoreboard: tuple = self._render_board()
-        self.rendered_high_score: tuple = self._render_high_score()
-
-        # image is built in update()
-        self.image = None
         self.rect = self.rendered_scoreboard[1]
+        self.rendered_high_score: tuple = self._to_screen(
+            self._render_high_score()
+        )
+
+        # player score is rendered in update(), only when it changes
+        self.rendered_player_score = None
+        self.rendered_score_value = None
+        self.text_stats = CacheStats()
 
     def update(self):
         """
-        Reset the scoreboard surface and then blit text onto the scoreboard.
-        Only the player score is rendered on each frame, board and high score
-        are rendered at init.
+        Render the player score if it has changed. Only the player score is
+        re-rendered, board and high score are rendered at init.
         """
-        self.image = self.rendered_scoreboard[0].copy()
-        self.image.blits([
-            self.rendered_high_score,
+        if self.player_score == self.rendered_score_value:
+            self.text_stats.hits += 1
+            return
+        self.text_stats.misses += 1
+        self.rendered_score_value = self.player_score
+        self.rendered_player_score = self._to_screen(
             self._render_player_score()
-        ])
+        )
 
-    def blit_self(self):
-        """blit scoreboard to the screen"""
-        self.game.screen.blit(self.image, self.rect)
+    def submit(self, frame):
+        """
+        Submit the board as a static layer, and the scores on top of it
+        """
+        frame.submit_static(
+            LAYER_SCOREBOARD, 'scoreboard', lambda: (self.rendered_scoreboard,)
+        )
+        frame.submit(LAYER_SCORE, *self.rendered_high_score)
+        if self.rendered_player_score:
+            frame.submit(LAYER_SCORE, *self.rendered_player_score)
+
+    def _to_screen(self, rendered):
+        """Move a (surface, rect) pair from board to screen coordinates"""
+        surf, rect = rendered
+        return surf, rect.move(self.rect.topleft)
 
     def _render_board(self):
         """
@@ -110,10 +131,14 @@ class FpsDisplay:
 
         self.image, self.rect = self._get_font_surface()
         # used for self frame-rate limiting
-        target_fps = game.vars.fps_refresh_rate
-        self.target_idle = 1000 / target_fps  # time is MS to wait
+        self.target_idle = 0
+        self.set_refresh_rate(game.vars.fps_refresh_rate)
         self.idle_time = 0
 
+    def set_refresh_rate(self, target_fps):
+        """Set how many times per second the FPS text is re-rendered"""
+        self.target_idle = 1000 / target_fps  # time is MS to wait
+
     def update(self):
         """Update the Surface with the current FPS"""
         if self.idle_time < self.target_idle:  # milliseconds
@@ -122,8 +147,8 @@ class FpsDisplay:
             self.idle_time = 0
             self.image, self.rect = self._get_font_surface()
 
-    def blit_self(self):
-        self.game.screen.blit(self.image, self.rect)
+    def submit(self, frame):
+        frame.submit(LAYER_HUD, self.image, self.rect)
 
     def _get_font_surface(self):
         """
@@ -0,0 +1,106 @@
+"""
+Frame pacing. The FramePacer decides how the main loop waits for the next
+frame and keeps frame time statistics for each pacing mode so the modes can
+be compared on a given machine. Modes:
+    'tick'      - clock.tick(max_fps), sleeps between frames
+    'busy'      - clock.tick_busy_loop(max_fps), spins for a more exact rate
+    'vsync'     - no clock cap, the display flip waits for the vertical sync
+    'uncapped'  - no cap at all
+While the window is unfocused or minimized the loop is throttled to a low
+idle rate regardless of the mode.
+
+Vsync is a property of the window, which is only created once, so cycling
+the modes in game only switches between the modes the window supports: a
+vsync window stays in 'vsync', any other window cycles 'tick', 'busy' and
+'uncapped'. Compare vsync against the others by starting the game with
+Vars.frame_pacing set to each.
+"""
+import logging
+
+from metrics import RollingStats
+
+logger = logging.getLogger(__name__)
+
+
+class FramePacer:
+    modes = ('tick', 'busy', 'vsync', 'uncapped')
+
+    def __init__(self, game):
+        self.game = game
+        self.vars = game.vars
+        self.clock = game.clock
+
+        self.mode = self.vars.frame_pacing
+        # set by the game once it has a window with vsync on
+        self.vsync = False
+        # frame times in ms per mode, throttled frames are not recorded
+        self.stats = {
+            mode: RollingStats(self.vars.pacing_window) for mode in self.modes
+        }
+
+        # background throttling
+        self.focused = True
+        self.minimized = False
+
+    @property
+    def throttled(self):
+        return self.minimized or not self.focused
+
+    def tick(self):
+        """Wait for the next frame and return the frame time in ms"""
+        if self.throttled:
+            return self.clock.tick(self.vars.idle_fps)
+
+        if self.mode == 'tick':
+            frame_ms = self.clock.tick(self.vars.max_fps)
+        elif self.mode == 'busy':
+            frame_ms = self.clock.tick_busy_loop(self.vars.max_fps)
+        else:  # 'vsync' and 'uncapped'
+            frame_ms = self.clock.tick()
+
+        self.stats[self.mode].add(frame_ms)
+        return frame_ms
+
+    def jitter(self, mode=None):
+        """
+        Return the frame time statistics of a mode (default is the current
+        mode) as a dict of mean, standard deviation and 99th percentile in ms
+        """
+        stats = self.stats[mode or self.mode]
+        return {
+            'mean': stats.mean,
+            'stdev': stats.stdev,
+            'p99': stats.percentile(99),
+        }
+
+    def available_modes(self):
+        """Return the modes the current window can actually pace with"""
+        if self.vsync:
+            return ('vsync',)
+        return tuple(mode for mode in self.modes if mode != 'vsync')
+
+    def cycle_mode(self):
+        """
+        Log the stats of the current mode and switch to the next mode the
+        window supports
+        """
+        self.log_jitter()
+        modes = self.available_modes()
+        if self.mode in modes:
+            self.mode = modes[(modes.index(self.mode) + 1) % len(modes)]
+        else:
+            self.mode = modes[0]
+        logger.info('frame pacing mode: %s', self.mode)
+
+    def log_jitter(self):
+        jitter = self.jitter()
+        logger.info(
+            'pacing %s: mean %.2f ms, stdev %.2f ms, p99 %.2f ms',
+            self.mode, jitter['mean'], jitter['stdev'], jitter['p99']
+        )
+
+    def set_focused(self, focused):
+        self.focused = focused
+
+    def set_minimized(self, minimized):
+        self.minimized = minimized
@@ -0,0 +1,64 @@
+"""
+Pipelined simulation. When Vars.pipelined is on, the game update runs on a
+SimulationThread while the main thread renders the previous frame. After each
+update the thread submits a snapshot of what is on screen (surfaces and
+immutable positions) into one of two render frames. The main thread only
+draws from the front frame, so it never touches the sprites while they are
+being updated.
+"""
+import threading
+
+
+class SimulationThread(threading.Thread):
+    def __init__(self, game):
+        super().__init__(daemon=True)
+        self.game = game
+
+        # snapshots, the thread writes to buffers[back] while the main thread
+        # renders self.front
+        self.buffers = [game.render.new_frame(), game.render.new_frame()]
+        self.back = 0
+        self.front = self.buffers[1]
+
+        self.dt = 0
+        self.error = None
+        self._start_step = threading.Event()
+        self._step_done = threading.Event()
+        self._step_done.set()
+        self.pending = False
+
+    def run(self):
+        while True:
+            self._start_step.wait()
+            self._start_step.clear()
+            try:
+                self.game._update_game(self.dt)
+                back = self.buffers[self.back]
+                back.clear()
+                self.game.submit_snapshot(back)
+            except Exception as e:  # re-raised on the main thread
+                self.error = e
+            self._step_done.set()
+
+    def step(self, dt):
+        """Start updating the game by dt seconds on the simulation thread"""
+        self.dt = dt
+        self.pending = True
+        self._step_done.clear()
+        self._start_step.set()
+
+    def wait(self):
+        """
+        Block until the running step (if any) is done, then swap the buffers
+        so the new snapshot becomes the front. The game objects are safe to
+        use from the main thread until the next step().
+        """
+        if not self.pending:
+            return
+        self._step_done.wait()
+        self.pending = False
+        if self.error:
+            raise self.error
+
+        self.front = self.buffers[self.back]
+        self.back ^= 1
@@ -0,0 +1,74 @@
+"""
+Adaptive quality control. The QualityController watches how long each frame
+takes to process and steps the game's quality level down when the frame
+budget is exceeded, or back up when there is plenty of headroom. The quality
+levels are defined in settings.Vars.quality_levels, level 0 being the best.
+"""
+import logging
+import math
+
+from metrics import RollingStats
+
+logger = logging.getLogger(__name__)
+
+
+class QualityController:
+    def __init__(self, game):
+        self.game = game
+        self.vars = game.vars
+
+        self.enabled = self.vars.adaptive_quality
+        self.levels = self.vars.quality_levels
+        self.level = 0
+
+        # frame work time in ms, excluding the waits in tick() and flip()
+        self.frame_times = RollingStats(self.vars.quality_window)
+        self.budget = 1000 / self.vars.max_fps
+        self.downgrade_at = self.budget * self.vars.quality_downgrade_ratio
+        self.upgrade_at = self.budget * self.vars.quality_upgrade_ratio
+
+        self.apply_level(self.level)
+
+    def update(self, frame_ms):
+        """
+        Record the last frame time. Once a full window of samples has been
+        collected compare the average against the frame budget and step the
+        quality level if needed.
+        """
+        if not self.enabled:
+            return
+
+        self.frame_times.add(frame_ms)
+        if not self.frame_times.full:
+            return
+
+        mean = self.frame_times.mean
+        if mean > self.downgrade_at and self.level < len(self.levels) - 1:
+            self._step(1, mean)
+        elif mean < self.upgrade_at and self.level > 0:
+            self._step(-1, mean)
+
+    def _step(self, direction, mean):
+        """Move one quality level down (1) or up (-1) and log the change"""
+        self.apply_level(self.level + direction)
+        logger.info(
+            'quality %s to level %d: avg frame %.2f ms, budget %.2f ms',
+            'lowered' if direction > 0 else 'raised', self.level, mean,
+            self.budget
+        )
+        # judge the new level on fresh samples only
+        self.frame_times.clear()
+
+    def apply_level(self, level):
+        """Push the settings of a quality level out to the game objects"""
+        self.level = level
+        settings = self.levels[level]
+
+        asteroids = self.game.asteroids
+        asteroids.set_active_count(
+            math.ceil(asteroids.num_asteroids * settings['asteroid_ratio'])
+        )
+        asteroids.set_rotation_step(settings['rotation_step'])
+        self.game.fps_display.set_refresh_rate(settings['fps_refresh_rate'])
+        if self.game.starfield:
+            self.game.starfield.set_layer_count(settings['star_layers'])
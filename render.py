@@ -0,0 +1,143 @@
+"""
+Layered rendering. Every frame, the game objects submit what they want drawn
+to a RenderFrame together with a layer index. The RenderQueue then flushes
+the frame to the screen one layer at a time, lowest index first, with a
+single Surface.blits call per layer, and records the number of blits and the
+time spent on each layer.
+
+Things that rarely change are submitted with submit_static, which composites
+them once and re-uses the cached result until the key is invalidated.
+"""
+from time import perf_counter
+import pygame as pg
+
+from metrics import CacheStats
+
+# layer indices, drawn in ascending order
+LAYER_BG = 0
+LAYER_FX = 1
+LAYER_BULLETS = 2
+LAYER_SHIP = 3
+LAYER_FLEET = 4
+LAYER_SCOREBOARD = 5
+LAYER_SCORE = 6
+LAYER_DEBUG = 7
+LAYER_MENU_BG = 8
+LAYER_MENU = 9
+LAYER_HUD = 10
+NUM_LAYERS = 11
+LAYER_NAMES = ('bg', 'fx', 'bullets', 'ship', 'fleet', 'scoreboard', 'score',
+               'debug', 'menu bg', 'menu', 'hud')
+
+
+class RenderFrame:
+    """The blit sequences of one frame, one list per layer"""
+    def __init__(self, queue):
+        self.queue = queue
+        self.layers = [[] for _ in range(NUM_LAYERS)]
+        # what the debug overlay shows, see DebugOverlay.collect()
+        self.debug = None
+
+    def submit(self, layer, surface, dest, area=None):
+        """Add a single blit to a layer"""
+        if area is None:
+            self.layers[layer].append((surface, dest))
+        else:
+            self.layers[layer].append((surface, dest, area))
+
+    def submit_many(self, layer, blit_sequence):
+        """Add (surface, dest) or (surface, dest, area) items to a layer"""
+        self.layers[layer].extend(blit_sequence)
+
+    def submit_static(self, layer, key, builder):
+        """
+        Add the cached composite stored under key to a layer. builder is only
+        called when nothing is cached, it must return a blit sequence.
+        """
+        self.layers[layer].extend(self.queue.get_static(key, builder))
+
+    def extend(self, other):
+        """Add everything submitted to another frame to this frame"""
+        for layer, other_layer in zip(self.layers, other.layers):
+            layer.extend(other_layer)
+
+    def clear(self):
+        for layer in self.layers:
+            layer.clear()
+        self.debug = None
+
+
+class RenderQueue:
+    def __init__(self, screen):
+        self.screen = screen
+        # the frame that is drawn on the next flush
+        self.frame = RenderFrame(self)
+
+        # composited static layers, {key: blit sequence}
+        self.static_cache = {}
+        self.static_stats = CacheStats()
+
+        # stats of the last flush for each layer
+        self.draw_counts = [0] * NUM_LAYERS
+        self.timings = [0.0] * NUM_LAYERS  # ms
+
+    def new_frame(self):
+        """Return an empty frame that can be filled and merged later"""
+        return RenderFrame(self)
+
+    def get_static(self, key, builder):
+        """Return the cached composite for key, building it if needed"""
+        cached = self.static_cache.get(key)
+        if cached is None:
+            self.static_stats.misses += 1
+            cached = self.static_cache[key] = self._composite(builder())
+        else:
+            self.static_stats.hits += 1
+        return cached
+
+    def draw(self, frame, surface):
+        """Blit every layer of a frame onto another surface, lowest first"""
+        for items in frame.layers:
+            if items:
+                surface.blits(items, doreturn=False)
+
+    def invalidate(self, key):
+        """Drop a cached static composite so it is rebuilt on next submit"""
+        self.static_cache.pop(key, None)
+
+    def flush(self):
+        """Blit every layer of the frame to the screen, then empty the frame"""
+        screen = self.screen
+        for index, items in enumerate(self.frame.layers):
+            if items:
+                start = perf_counter()
+                screen.blits(items, doreturn=False)
+                self.timings[index] = (perf_counter() - start) * 1000
+                self.draw_counts[index] = len(items)
+                items.clear()
+            else:
+                self.timings[index] = 0.0
+                self.draw_counts[index] = 0
+        self.frame.debug = None
+
+    @staticmethod
+    def _composite(blit_sequence):
+        """
+        Flatten a blit sequence onto one surface covering the union of its
+        rects. A sequence of one blit is kept as it is.
+        """
+        items = tuple(blit_sequence)
+        if len(items) <= 1:
+            return items
+
+        rects = [
+            pg.Rect(item[1][:2], pg.Rect(item[2]).size if len(item) > 2
+                    else item[0].get_size())
+            for item in items
+        ]
+        union = rects[0].unionall(rects[1:])
+
+        surf = pg.Surface(union.size, flags=pg.SRCALPHA)
+        for item, rect in zip(items, rects):
+            surf.blit(item[0], rect.move(-union.x, -union.y), *item[2:])
+        return ((surf, union.topleft),)
@@ -1,24 +1,41 @@
 """A module to hold the settings for the Alien Invasion game"""
 import pygame as pg
 from pygame.color import Color
-from pygame.font import Font
 from os.path import join
 
+from assets import load_font
+
 
 class Vars:
-    def __init__(self):
+    def __init__(self, render_h=None):
         """initialize the game's settings. The idea to use a settings class
-        comes from Python Crash Course"""
+        comes from Python Crash Course. render_h sets the internal render
+        height, see below"""
 
-        # Get user's display size
-        display_info = pg.display.Info()
-        display_w = display_info.current_w
-        display_h = display_info.current_h
+        # Get user's display size. The desktop size does not change once a
+        # window has been opened, unlike pg.display.Info()
+        display_w, display_h = pg.display.get_desktop_sizes()[0]
 
         # Screen settings
         self.max_fps = 144
+        # 'tick', 'busy', 'vsync' or 'uncapped', see pacing.py
+        self.frame_pacing = 'tick'
+        self.pacing_window = 300  # frames kept for jitter statistics
+        self.idle_fps = 10  # frame rate while unfocused or minimized
+        # update the game on a second thread while the last frame is drawn
+        self.pipelined = False
         self.window_w = int(.75 * display_w)
         self.window_h = int(.90 * display_h)
+        # Internal render height. None renders straight to the window,
+        # otherwise the scene is drawn at this height (the width follows the
+        # window's aspect ratio) and scaled up to the window once per frame.
+        # Sizes and speeds below follow the render resolution.
+        self.render_h = render_h  # e.g. 540
+        if self.render_h:
+            self.screen_w = round(self.render_h * self.window_w / self.window_h)
+            self.screen_h = self.render_h
+        else:
+            self.screen_w, self.screen_h = self.window_w, self.window_h
 
         # Universal color settings
         self.black_rgb = 0, 0, 0
@@ -31,8 +48,13 @@ class Vars:
 
         # Menu Settings
         self.menu_bg_rgb = self.black_rgb
-        self.menu_font = Font(join('fonts/', 'arcade.ttf'), 35)
+        self.menu_font = load_font(join('fonts/', 'arcade.ttf'), 35)
         self.menu_font_rgb = self.yellow_rgb
+        # the paused game behind the menu is captured once, darkened to this
+        # brightness (1 keeps it as is) and blurred over this many pixels
+        # (0 or 1 keeps it sharp)
+        self.menu_backdrop_dim = .5
+        self.menu_backdrop_blur = 0
 
         # Control settings
         self.key_move_r = pg.K_d
@@ -41,32 +63,73 @@ class Vars:
         self.key_quit = pg.K_q
         self.key_menu = pg.K_ESCAPE
         self.key_toggle_debug = pg.K_F1
+        self.key_cycle_pacing = pg.K_F2
+        self.key_quick_save = pg.K_F5
+        self.key_quick_load = pg.K_F9
+        # number of shots averaged for the input latency measurement
+        self.latency_window = 60
 
         # Ship settings
         self.ship_scale = 0.11
-        self.ship_speed = 0.50 * self.window_w  # pixels-per-second
+        self.ship_speed = 0.50 * self.screen_w  # pixels-per-second
 
         # Bullet settings
-        self.bullet_speed = 0.80 * self.window_h  # pixels-per-second
+        self.bullet_speed = 0.80 * self.screen_h  # pixels-per-second
         self.max_bullets = 2
         self.bullets_persist = False
-        self.bullet_w = 0.003 * self.window_w
-        self.bullet_h = 0.028 * self.window_h
+        # seconds before a bullet that never left the screen is dropped
+        self.bullet_lifetime = 4.0
+        # at least a pixel, even at very low render resolutions
+        self.bullet_w = max(1, 0.003 * self.screen_w)
+        self.bullet_h = max(1, 0.028 * self.screen_h)
         self.bullet_color = self.light_blue_rgb
 
-        # Alien settings
+        # Spectator server, see spectator.py. Set a Unix socket path to use
+        # it instead of TCP
+        self.spectator = False
+        self.spectator_host = '127.0.0.1'
+        self.spectator_port = 8765
+        self.spectator_unix_path = None
+
+        # Sound settings, see sound.py
+        self.sound = True
+        self.sound_folder = 'sounds/'  # optional files replacing the effects
+        self.sound_frequency = 44100
+        self.sound_buffer = 256  # samples, smaller plays sooner
+        self.sound_channels = 12
+        self.sound_volume = 1.0
+
+        # Save settings
+        self.quick_save_path = join('savedata/', 'quicksave.bin')
+        # per-session gameplay statistics, see analytics.py
+        self.analytics = True
+        self.analytics_folder = join('savedata/', 'sessions/')
+        self.analytics_capacity = 8192  # rows kept in memory between writes
+
+        # Alien settings, waves may override the fleet size and speed
+        self.wave_folder = 'waves/'
         self.fleet_columns = 5
         self.fleet_rows = 5
         self.alien_scale = .060  # percent of screen height
-        self.alien_vel_x = 0.21 * self.window_w
-        self.fleet_drop_height = 0.05 * self.window_h
+        self.alien_vel_x = 0.21 * self.screen_w  # pixels-per-second
+        self.fleet_drop_height = 0.05 * self.screen_h
+        # the next fleet is built a few aliens per frame while the current
+        # one is alive, then spawned a few aliens per frame when it is gone
+        self.fleet_build_per_frame = 4
+        self.fleet_spawn_per_frame = 5
 
         # FPS display
         self.show_fps = True
         self.fps_refresh_rate = 3  # measured in... FPS
-        self.fps_font = Font(join('fonts/', 'arcade.ttf'), 22)
+        self.fps_font = load_font(join('fonts/', 'arcade.ttf'), 22)
         self.fps_font_rgb = self.yellow_rgb
 
+        # Debug overlay, shown in game mode with the debug key
+        self.debug_refresh_rate = 4  # stats panel redraws per second
+        self.debug_hit_hold = .5  # seconds a collision line stays visible
+        self.debug_font = pg.font.Font(None, 22)
+        self.debug_font_rgb = self.white_rgb
+
         # Scoreboard
         self.scoreboard_font_rgba = Color(*self.yellow_rgb, 100)
 
@@ -74,7 +137,39 @@ class Vars:
         self.num_asteroids = 2
         self.asteroid_scale = 0.14
         self.asteroid_rps = 45  # degrees-per-second
-        self.asteroid_velocity = .08 * self.window_w  # pixels-per-second
+        self.asteroid_velocity = .08 * self.screen_w  # pixels-per-second
+
+        # Starfield, a scrolling parallax background. Off draws the static
+        # background image. Speeds are screen heights per second
+        self.starfield = True
+        self.starfield_speed = .01  # the background image
+        self.starfield_seed = 7
+        # (speed, star count, radius, brightness) of each star layer, far first
+        self.star_layers = (
+            (.03, 90, 1, 140),
+            (.07, 40, 1, 210),
+            (.15, 14, 2, 255),
+        )
+
+        # Adaptive quality settings
+        self.adaptive_quality = True
+        self.quality_window = 90  # frames averaged before each decision
+        # ratios of the frame budget (1 / max_fps) that trigger a level change
+        self.quality_downgrade_ratio = 1.0
+        self.quality_upgrade_ratio = 0.6
+        # level 0 is full quality. rotation_step is in degrees, 0 rotates the
+        # asteroids every frame. star_layers is the number of star layers
+        # drawn over the background
+        self.quality_levels = (
+            {'asteroid_ratio': 1.0, 'rotation_step': 0,
+             'fps_refresh_rate': self.fps_refresh_rate, 'star_layers': 3},
+            {'asteroid_ratio': 1.0, 'rotation_step': 3,
+             'fps_refresh_rate': 2, 'star_layers': 2},
+            {'asteroid_ratio': 0.5, 'rotation_step': 6,
+             'fps_refresh_rate': 1, 'star_layers': 1},
+            {'asteroid_ratio': 0.0, 'rotation_step': 12,
+             'fps_refresh_rate': 0.5, 'star_layers': 0},
+        )
 
 
 def scale(child_surface, comparison_surface, ratio):
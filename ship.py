@@ -2,8 +2,11 @@
 import pygame as pg
 from pygame.sprite import Sprite
 
+from assets import load_image
 from settings import scale
 from bullet import Bullet
+from ecs import Archetype, render
+from render import LAYER_BULLETS, LAYER_SHIP
 
 
 class Ship(Sprite):
@@ -16,17 +19,32 @@ class Ship(Sprite):
         self.vars = game.vars
         self.game = game
 
-        # create a sprite group for bullet sprites
+        # create a sprite group for bullet sprites, the bullets' state is in
+        # a table the world's systems update
         self.bullets = pg.sprite.Group()
+        self.bullet_table = game.world.add_table(Archetype(
+            'bullets',
+            ('position', 'velocity', 'image_index', 'lifetime', 'collider'),
+            remove_offscreen=True, prev_rect=True,
+        ))
 
         # load and scale the ship image then get its rectangle
-        ship_surface = pg.image.load('images/ship1.bmp').convert_alpha()
+        ship_surface = load_image('images/ship1.bmp').convert_alpha()
         self.image, self.rect = scale(
             ship_surface, self.game.screen, self.vars.ship_scale
         )
 
+        # mask is built once here and used for pixel-perfect collision
+        self.mask = pg.mask.from_surface(self.image)
+
+        # every bullet shares one image and mask
+        self.bullet_image, self.bullet_mask = self._render_bullet()
+        self.bullet_images = [self.bullet_image]
+
         # start the new ship at the bottom center of the screen
         self.rect.midbottom = self.game.rect.midbottom
+        # where the ship was before its last update, for swept collision
+        self.prev_rect = self.rect.copy()
 
         self.x = float(self.rect.x)
         # movement flags
@@ -41,6 +59,7 @@ class Ship(Sprite):
         amount of seconds passed since last update
         """
 
+        self.prev_rect.update(self.rect)
         # pixels per second * delta time in seconds
         move_distance = self.velocity * dt
 
@@ -51,11 +70,70 @@ class Ship(Sprite):
 
         self.rect.x = self.x
 
+    def restore(self, x, moving_left, moving_right):
+        """Move the ship to a saved position and movement state"""
+        self.x = x
+        self.rect.x = x
+        self.prev_rect.update(self.rect)
+        self.moving_left = moving_left
+        self.moving_right = moving_right
+
+    def align_bullets(self, world, dt):
+        """
+        System keeping the bullets lined up with the ship's centerx until
+        they clear the ship
+        """
+        table = self.bullet_table
+        position = table.columns['position']
+        size = table.columns['collider']
+        top, centerx = self.rect.top, self.rect.centerx
+        for x in range(0, 2 * table.count, 2):
+            if position[x + 1] + size[x + 1] >= top:
+                position[x] = centerx - size[x] // 2
+
+    def clear_bullets(self):
+        """Remove every bullet"""
+        self.bullets.empty()
+        self.bullet_table.clear()
+
+    def restore_bullets(self, states):
+        """
+        Replace the bullets with new bullets at the saved (x, y, lifetime)
+        states
+        """
+        self.clear_bullets()
+        for x, y, lifetime in states:
+            bullet = Bullet(self.game)
+            bullet.x, bullet.y = x, y
+            bullet.lifetime = lifetime
+            bullet.rect.topleft = (x, y)
+            bullet.prev_rect.update(bullet.rect)
+            self.bullets.add(bullet)
+
     def fire_bullet(self):
-        """Initialize a new bullet and add it to the bullet group"""
+        """
+        Initialize a new bullet and add it to the bullet group. Returns True
+        if a bullet was fired
+        """
         if len(self.bullets) < self.vars.max_bullets:
             self.bullets.add(Bullet(self.game))
+            self.game.sounds.play('shot')
+            self.game.analytics.shots += 1
+            return True
+        return False
 
-    def blit_self(self):
-        """blit the ship to the screen at its current position"""
-        self.game.screen.blit(self.image, self.rect)
+    def _render_bullet(self):
+        """
+        Draw the bullet ellipse onto a transparent surface, return the surface
+        and its mask
+        """
+        surf = pg.Surface((self.vars.bullet_w, self.vars.bullet_h),
+                          flags=pg.SRCALPHA)
+        pg.draw.ellipse(surf, self.vars.bullet_color, surf.get_rect())
+        return surf, pg.mask.from_surface(surf)
+
+    def submit(self, frame):
+        """Submit the bullets and the ship at its current position"""
+        frame.submit_many(LAYER_BULLETS,
+                          render(self.bullet_table, self.bullet_images))
+        frame.submit(LAYER_SHIP, self.image, self.rect.topleft)
@@ -0,0 +1,182 @@
+"""
+Compact binary snapshots of a running game. A snapshot holds everything
+needed to continue a game exactly where it was captured: score, wave, ship,
+bullets, aliens, asteroids and the state of the game's random generator.
+
+Layout (little endian), each section is a fixed header followed by packed
+arrays:
+    header      magic b'AISS', format version
+    game        score, wave index, wave time
+    ship        x, moving left, moving right
+    bullets     count, then (x, y, lifetime) doubles per bullet
+    aliens      count, then how many of them are still queued to spawn and
+                the fleet's floor and ship contact counts, then (base x,
+                base y, phase, delay) doubles per alien, then one image
+                index (uint16) per alien. Spawned aliens come first
+    asteroids   count, then (center x, center y, x velocity, y velocity,
+                degree, rotation velocity, scale) doubles per asteroid, then
+                one image index (uint16) per asteroid
+    rng         Mersenne Twister key (625 uint32), gauss flag, gauss value
+"""
+from array import array
+import struct
+import sys
+
+MAGIC = b'AISS'
+VERSION = 2
+
+HEADER = struct.Struct('<4sH')
+GAME = struct.Struct('<qid')
+SHIP = struct.Struct('<d??')
+COUNT = struct.Struct('<I')
+FLEET = struct.Struct('<III')
+GAUSS = struct.Struct('<?d')
+
+BULLET_FIELDS = 3
+ALIEN_FIELDS = 4
+ASTEROID_FIELDS = 7
+RNG_KEY_LENGTH = 625
+
+
+class SnapshotError(ValueError):
+    """The data is not a snapshot this version of the game can read"""
+
+
+def dump(game):
+    """Return the game state as snapshot bytes"""
+    ship = game.ship
+    fleet = game.alien_fleet
+    asteroids = game.asteroids.asteroid_pool
+    aliens = fleet.wave_aliens()
+    bullets = ship.bullets.sprites()
+
+    parts = [
+        HEADER.pack(MAGIC, VERSION),
+        GAME.pack(game.scoreboard.player_score, fleet.wave_index,
+                  fleet.wave_time),
+        SHIP.pack(ship.x, ship.moving_left, ship.moving_right),
+    ]
+
+    parts.append(COUNT.pack(len(bullets)))
+    parts.append(_to_bytes(array('d', [
+        value for bullet in bullets
+        for value in (bullet.x, bullet.y, bullet.lifetime)
+    ])))
+
+    parts.append(COUNT.pack(len(aliens)))
+    parts.append(FLEET.pack(fleet.queued_count(), fleet.floor_contacts,
+                            fleet.ship_contacts))
+    parts.append(_to_bytes(array('d', [
+        value for alien in aliens
+        for value in (alien.base_x, alien.base_y, alien.phase, alien.delay)
+    ])))
+    parts.append(_to_bytes(array('H', [
+        alien.image_index for alien in aliens
+    ])))
+
+    parts.append(COUNT.pack(len(asteroids)))
+    parts.append(_to_bytes(array('d', [
+        value for asteroid in asteroids
+        for value in (asteroid.centerx, asteroid.centery, asteroid.vel_x,
+                      asteroid.vel_y, asteroid.degree, asteroid.rotation_vel,
+                      asteroid.scale)
+    ])))
+    parts.append(_to_bytes(array('H', [
+        asteroid.image_index for asteroid in asteroids
+    ])))
+
+    _, key, gauss_next = game.rng.getstate()
+    parts.append(_to_bytes(array('I', key)))
+    parts.append(GAUSS.pack(gauss_next is not None, gauss_next or 0.0))
+
+    return b''.join(parts)
+
+
+def load(game, data):
+    """Restore the game state from snapshot bytes"""
+    reader = _Reader(data)
+
+    magic, version = reader.unpack(HEADER)
+    if magic != MAGIC:
+        raise SnapshotError('not a game snapshot')
+    if version != VERSION:
+        raise SnapshotError(f'unsupported snapshot version {version}')
+
+    score, wave_index, wave_time = reader.unpack(GAME)
+    ship_x, moving_left, moving_right = reader.unpack(SHIP)
+
+    bullet_count, = reader.unpack(COUNT)
+    bullet_values = reader.array('d', bullet_count * BULLET_FIELDS)
+
+    alien_count, = reader.unpack(COUNT)
+    queued, floor_contacts, ship_contacts = reader.unpack(FLEET)
+    if queued > alien_count:
+        raise SnapshotError('more queued aliens than aliens')
+    alien_values = reader.array('d', alien_count * ALIEN_FIELDS)
+    alien_images = reader.array('H', alien_count)
+
+    asteroid_count, = reader.unpack(COUNT)
+    asteroid_values = reader.array('d', asteroid_count * ASTEROID_FIELDS)
+    asteroid_images = reader.array('H', asteroid_count)
+
+    rng_key = reader.array('I', RNG_KEY_LENGTH)
+    has_gauss, gauss_next = reader.unpack(GAUSS)
+
+    # everything is read, now apply it
+    game.scoreboard.player_score = score
+    game.scoreboard.update()
+
+    game.ship.restore(ship_x, moving_left, moving_right)
+    game.ship.restore_bullets(
+        zip(bullet_values[::3], bullet_values[1::3], bullet_values[2::3])
+    )
+
+    game.alien_fleet.restore(wave_index, wave_time, [
+        (alien_images[i],
+         *alien_values[i * ALIEN_FIELDS:(i + 1) * ALIEN_FIELDS])
+        for i in range(alien_count)
+    ], queued, floor_contacts, ship_contacts)
+
+    pool = game.asteroids.asteroid_pool
+    for i, asteroid in enumerate(pool[:asteroid_count]):
+        asteroid.restore(
+            asteroid_images[i],
+            *asteroid_values[i * ASTEROID_FIELDS:(i + 1) * ASTEROID_FIELDS]
+        )
+
+    game.rng.setstate(
+        (3, tuple(rng_key), gauss_next if has_gauss else None)
+    )
+
+
+def _to_bytes(values):
+    """Return the bytes of an array in little endian order"""
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+class _Reader:
+    """Reads structs and arrays from a buffer, keeping track of the offset"""
+    def __init__(self, data):
+        self.view = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, fmt):
+        try:
+            values = fmt.unpack_from(self.view, self.offset)
+        except struct.error as e:
+            raise SnapshotError('truncated snapshot') from e
+        self.offset += fmt.size
+        return values
+
+    def array(self, typecode, length):
+        values = array(typecode)
+        end = self.offset + length * values.itemsize
+        if end > len(self.view):
+            raise SnapshotError('truncated snapshot')
+        values.frombytes(self.view[self.offset:end])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        self.offset = end
+        return values
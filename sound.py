@@ -0,0 +1,189 @@
+"""
+Sound effects. Every effect is decoded into a pg.mixer.Sound when the game
+loads, so playing one never waits on a file or a decoder. The game ships
+without audio files, so the default effects are synthesized here; a file in
+the sound folder named after an effect (e.g. sounds/shot.wav) replaces the
+synthesized version.
+
+The mixer is global to the process: it is opened by the first bank and
+shared by any later one, never closed under sounds another bank holds.
+Headless games (see env.py) have no sound at all.
+
+Effects play on a fixed pool of channels. When every channel is busy the
+oldest voice is stolen, and each effect has a minimum time between plays so
+heavy fire or a whole fleet blowing up at once can not flood the mixer.
+"""
+from array import array
+from io import BytesIO
+from time import perf_counter
+import logging
+import math
+import os
+import random
+import wave
+
+import pygame as pg
+
+from assets import list_assets, open_asset
+
+logger = logging.getLogger(__name__)
+
+# sample rate the effects are synthesized at, the mixer converts as needed
+SYNTH_RATE = 22050
+AMPLITUDE = 32767
+
+
+def _to_wav(samples):
+    """Return 16 bit mono samples (floats from -1 to 1) as WAV file bytes"""
+    pcm = array('h', (int(max(-1.0, min(1.0, s)) * AMPLITUDE)
+                      for s in samples))
+    buffer = BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SYNTH_RATE)
+        # WAV data is little endian, like array on every platform pygame runs
+        f.writeframes(pcm.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+def _envelope(i, length, attack=0.01):
+    """Fast attack, linear release"""
+    t = i / length
+    if t < attack:
+        return t / attack
+    return 1.0 - (t - attack) / (1.0 - attack)
+
+
+def synth_shot():
+    """A short square wave chirp sweeping down"""
+    length = int(.09 * SYNTH_RATE)
+    samples = []
+    phase = 0.0
+    for i in range(length):
+        phase += (1800 - 1200 * i / length) / SYNTH_RATE
+        square = 1.0 if phase % 1.0 < .5 else -1.0
+        samples.append(.35 * square * _envelope(i, length))
+    return samples
+
+
+def synth_explosion():
+    """Low passed noise with a long decay"""
+    # the noise has its own generator, the game's one must not be touched
+    noise = random.Random(1)
+    length = int(.45 * SYNTH_RATE)
+    samples = []
+    value = 0.0
+    for i in range(length):
+        # the filter closes as the explosion fades
+        cutoff = .25 * (1.0 - i / length) + .02
+        value += cutoff * (noise.uniform(-1.0, 1.0) - value)
+        samples.append(2.5 * value * _envelope(i, length) ** 2)
+    return samples
+
+
+def synth_hit():
+    """A falling sine thud with a little noise on top"""
+    noise = random.Random(2)
+    length = int(.3 * SYNTH_RATE)
+    samples = []
+    phase = 0.0
+    for i in range(length):
+        phase += (160 - 110 * i / length) / SYNTH_RATE
+        tone = math.sin(2 * math.pi * phase) + .3 * noise.uniform(-1.0, 1.0)
+        samples.append(.6 * tone * _envelope(i, length))
+    return samples
+
+
+# effect name: (synthesizer, volume, minimum seconds between plays)
+EFFECTS = {
+    'shot': (synth_shot, .35, .04),
+    'explosion': (synth_explosion, .6, .05),
+    'hit': (synth_hit, .8, .15),
+}
+
+
+class SoundBank:
+    def __init__(self, game):
+        """
+        Open the mixer and decode every effect. If there is no audio device,
+        or the game is headless, the bank stays disabled and play() does
+        nothing.
+        """
+        self.game = game
+        self.vars = game.vars
+
+        self.enabled = False
+        self.sounds = {}
+        self.min_interval = {}
+        self.last_played = {}
+        # the channel pool and when each channel last started a sound
+        self.channels = []
+        self.started = []
+
+        if not self.vars.sound or game.headless:
+            return
+        try:
+            self._init_mixer()
+            self._load_sounds()
+        except pg.error as e:
+            logger.warning('sound disabled: %s', e)
+            return
+        self.enabled = True
+
+    def _init_mixer(self):
+        """
+        Open the mixer with a small buffer, unless an earlier bank already
+        did, and reserve the channel pool
+        """
+        if not pg.mixer.get_init():
+            pg.mixer.init(frequency=self.vars.sound_frequency,
+                          buffer=self.vars.sound_buffer)
+        if pg.mixer.get_num_channels() < self.vars.sound_channels:
+            pg.mixer.set_num_channels(self.vars.sound_channels)
+        self.channels = [pg.mixer.Channel(i)
+                         for i in range(self.vars.sound_channels)]
+        self.started = [0.0] * len(self.channels)
+
+    def _load_sounds(self):
+        """Decode every effect, preferring files from the sound folder"""
+        files = {}
+        for file_name in list_assets(self.vars.sound_folder):
+            name, _ = os.path.splitext(file_name)
+            files.setdefault(name, file_name)
+
+        for name, (synth, volume, interval) in EFFECTS.items():
+            if name in files:
+                sound = pg.mixer.Sound(file=open_asset(
+                    os.path.join(self.vars.sound_folder, files[name])
+                ))
+            else:
+                sound = pg.mixer.Sound(file=_to_wav(synth()))
+            sound.set_volume(volume * self.vars.sound_volume)
+            self.sounds[name] = sound
+            self.min_interval[name] = interval
+            self.last_played[name] = -interval
+
+    def play(self, name):
+        """
+        Play an effect unless it was played too recently. Takes an idle
+        channel or steals the one playing the oldest sound.
+        """
+        if not self.enabled:
+            return
+        now = perf_counter()
+        if now - self.last_played[name] < self.min_interval[name]:
+            return
+        self.last_played[name] = now
+
+        index = self._free_channel()
+        self.channels[index].play(self.sounds[name])
+        self.started[index] = now
+
+    def _free_channel(self):
+        """Return the index of an idle channel, or of the oldest voice"""
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+        return self.started.index(min(self.started))
@@ -0,0 +1,267 @@
+"""
+Spectator server. When Vars.spectator is on, the game streams the state of
+its entities to any number of local subscribers over TCP (or a Unix socket)
+so a session can be watched or recorded from another process. The server
+runs an asyncio loop on its own thread, the game only hands it one state dict
+per frame and never waits on the network.
+
+Each client is sent deltas against the last frame it acknowledged: only the
+entities that moved, appeared or disappeared since then. A client has at most
+one unacknowledged message in flight, so a slow viewer simply receives fewer
+frames instead of building up a backlog or stalling the game.
+
+Protocol, every integer is little endian:
+    server -> client: a uint32 payload length, then the payload
+        HELLO    type (B), screen width (H), screen height (H)
+        FRAME    type (B), frame (I), score (q), changed count (I),
+                 removed count (I), then changed entities as
+                 kind (B), id (I), x (i), y (i), w (H), h (H)
+                 and removed entities as kind (B), id (I)
+    client -> server: acknowledged frame (I) after applying a FRAME
+See spectator_viewer.py for a reference client.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import struct
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+MSG_HELLO = 0
+MSG_FRAME = 1
+
+KIND_SHIP = 0
+KIND_BULLET = 1
+KIND_ALIEN = 2
+KIND_ASTEROID = 3
+
+LENGTH = struct.Struct('<I')
+HELLO = struct.Struct('<BHH')
+FRAME = struct.Struct('<BIqII')
+ENTITY = struct.Struct('<BIiiHH')
+REMOVED = struct.Struct('<BI')
+ACK = struct.Struct('<I')
+
+
+def encode_frame(frame, score, base, state):
+    """
+    Return a FRAME payload holding the changes that turn the 'base' state
+    into 'state'. States map (kind, id) to (x, y, w, h).
+    """
+    changed = [
+        (key, value) for key, value in state.items()
+        if base.get(key) != value
+    ]
+    removed = [key for key in base if key not in state]
+
+    parts = [FRAME.pack(MSG_FRAME, frame, score, len(changed), len(removed))]
+    parts.extend(ENTITY.pack(*key, *value) for key, value in changed)
+    parts.extend(REMOVED.pack(*key) for key in removed)
+    return b''.join(parts)
+
+
+def decode_frame(payload, state):
+    """
+    Apply a FRAME payload to a client state dict in place. Returns the frame
+    number and the score.
+    """
+    _, frame, score, num_changed, num_removed = FRAME.unpack_from(payload)
+    offset = FRAME.size
+    for _ in range(num_changed):
+        kind, eid, x, y, w, h = ENTITY.unpack_from(payload, offset)
+        state[kind, eid] = (x, y, w, h)
+        offset += ENTITY.size
+    for _ in range(num_removed):
+        state.pop(REMOVED.unpack_from(payload, offset), None)
+        offset += REMOVED.size
+    return frame, score
+
+
+class SpectatorServer:
+    def __init__(self, game):
+        self.game = game
+        self.vars = game.vars
+
+        self.loop = None
+        self.clients = set()
+        self.frame = 0
+        # (frame, score, state) of the newest published frame
+        self.latest = None
+        # entity ids, given out once per sprite and never reused
+        self._ids = weakref.WeakKeyDictionary()
+        self._next_id = itertools.count(1)
+
+        self._ready = threading.Event()
+        # why the server could not start, if it could not
+        self.error = None
+        # set on the server's loop to close it, see stop()
+        self._stopping = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self, timeout=5.0):
+        """
+        Start serving on a background thread. Returns False, after logging
+        why, if the server could not start listening within timeout seconds
+        """
+        self.thread.start()
+        if not self._ready.wait(timeout):
+            logger.warning('spectator server did not start in %.1f s', timeout)
+            return False
+        if self.error:
+            logger.warning('spectator server disabled: %s', self.error)
+            return False
+        return True
+
+    def stop(self):
+        """
+        Close the server and every client connection, wait for the server
+        thread and remove the Unix socket file
+        """
+        if self.loop and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self._stopping.set)
+            self.thread.join()
+        path = self.vars.spectator_unix_path
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+    def publish(self):
+        """
+        Hand the current entity state to the server. Called from the game
+        loop once per frame, never blocks. Does nothing without subscribers.
+        """
+        if not self.clients:
+            return
+        self.frame += 1
+        self.loop.call_soon_threadsafe(
+            self._on_frame, self.frame, self.game.scoreboard.player_score,
+            self._collect_state()
+        )
+
+    def _collect_state(self):
+        """Return {(kind, id): (x, y, w, h)} for every entity on screen"""
+        state = {}
+        ids = self._ids
+        groups = (
+            (KIND_BULLET, self.game.ship.bullets),
+            (KIND_ALIEN, self.game.alien_fleet),
+            (KIND_ASTEROID, self.game.asteroids),
+        )
+        for kind, group in groups:
+            for sprite in group:
+                eid = ids.get(sprite)
+                if eid is None:
+                    eid = ids[sprite] = next(self._next_id)
+                state[kind, eid] = tuple(sprite.rect)
+        ship = self.game.ship
+        state[KIND_SHIP, 0] = tuple(ship.rect)
+        return state
+
+    def _run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        try:
+            if self.vars.spectator_unix_path:
+                server = await asyncio.start_unix_server(
+                    self._handle_client, self.vars.spectator_unix_path
+                )
+            else:
+                server = await asyncio.start_server(
+                    self._handle_client, self.vars.spectator_host,
+                    self.vars.spectator_port
+                )
+        except (OSError, ValueError) as e:
+            # e.g. the port is taken, reported by start()
+            self.error = e
+            return
+        finally:
+            self._ready.set()
+        logger.info('spectator server listening on %s',
+                    ', '.join(str(s.getsockname()) for s in server.sockets))
+        async with server:
+            await self._stopping.wait()
+            # closing a connection ends its handler, wait for them to finish
+            handlers = [client.handler for client in self.clients]
+            for client in self.clients:
+                client.writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+    def _on_frame(self, frame, score, state):
+        """Store the newest frame and wake every client that can take it"""
+        self.latest = (frame, score, state)
+        for client in self.clients:
+            client.wake.set()
+
+    async def _handle_client(self, reader, writer):
+        client = _Client(self, reader, writer)
+        self.clients.add(client)
+        logger.info('spectator connected, %d watching', len(self.clients))
+        try:
+            await client.run()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+            logger.info('spectator left, %d watching', len(self.clients))
+
+
+class _Client:
+    """One subscriber. Sends the newest frame whenever nothing is in flight"""
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.wake = asyncio.Event()
+        # the task serving this client
+        self.handler = asyncio.current_task()
+
+        # the state the client has confirmed, deltas are built against it
+        self.acked_state = {}
+        self.sent_frame = 0
+        # (frame, state) of the message waiting for an ack
+        self.in_flight = None
+
+    async def run(self):
+        rect = self.server.game.rect
+        self._send(HELLO.pack(MSG_HELLO, rect.w, rect.h))
+        await self.writer.drain()
+
+        ack_reader = asyncio.ensure_future(self._read_acks())
+        try:
+            while not ack_reader.done():
+                await self.wake.wait()
+                self.wake.clear()
+                latest = self.server.latest
+                if self.in_flight or not latest or latest[0] <= self.sent_frame:
+                    continue
+                frame, score, state = latest
+                self._send(encode_frame(frame, score, self.acked_state, state))
+                self.in_flight = frame, state
+                self.sent_frame = frame
+                await self.writer.drain()
+        finally:
+            ack_reader.cancel()
+        # raises the error that ended the ack reader, e.g. a disconnect
+        ack_reader.result()
+
+    async def _read_acks(self):
+        try:
+            while True:
+                frame, = ACK.unpack(await self.reader.readexactly(ACK.size))
+                if self.in_flight and frame == self.in_flight[0]:
+                    self.acked_state = self.in_flight[1]
+                    self.in_flight = None
+                    # a newer frame may have been published meanwhile
+                    self.wake.set()
+        finally:
+            # let run() notice that the client is gone
+            self.wake.set()
+
+    def _send(self, payload):
+        self.writer.write(LENGTH.pack(len(payload)) + payload)
@@ -0,0 +1,83 @@
+"""
+Reference spectator client. Connects to a game running with Vars.spectator
+on, rebuilds the entity state from the delta stream and draws each entity as
+a rectangle.
+
+usage: python spectator_viewer.py [host] [port]
+       python spectator_viewer.py --unix path
+"""
+import socket
+import sys
+
+import pygame as pg
+
+import spectator
+
+# outline color of each entity kind
+KIND_COLORS = {
+    spectator.KIND_SHIP: (51, 204, 255),
+    spectator.KIND_BULLET: (255, 255, 255),
+    spectator.KIND_ALIEN: (255, 0, 255),
+    spectator.KIND_ASTEROID: (89, 89, 89),
+}
+
+
+class SpectatorViewer:
+    def __init__(self, sock):
+        self.sock = sock
+        self.stream = sock.makefile('rb')
+        self.state = {}
+        self.score = 0
+
+        msg_type, width, height = spectator.HELLO.unpack(self._read_message())
+        assert msg_type == spectator.MSG_HELLO
+        pg.init()
+        self.screen = pg.display.set_mode((width, height))
+        pg.display.set_caption('Space Knockoffs! - spectating')
+        self.font = pg.font.Font(None, 30)
+
+    def run(self):
+        while True:
+            for event in pg.event.get():
+                if event.type == pg.QUIT:
+                    return
+
+            payload = self._read_message()
+            frame, self.score = spectator.decode_frame(payload, self.state)
+            # ack so the server sends the next delta
+            self.sock.sendall(spectator.ACK.pack(frame))
+
+            self._draw()
+
+    def _read_message(self):
+        header = self.stream.read(spectator.LENGTH.size)
+        if len(header) < spectator.LENGTH.size:
+            raise ConnectionError('game closed the connection')
+        length, = spectator.LENGTH.unpack(header)
+        return self.stream.read(length)
+
+    def _draw(self):
+        self.screen.fill((0, 0, 0))
+        for (kind, _), rect in self.state.items():
+            pg.draw.rect(self.screen, KIND_COLORS[kind], rect, width=1)
+        score = self.font.render(str(self.score), True, (255, 255, 0))
+        self.screen.blit(score, (10, 10))
+        pg.display.flip()
+
+
+def connect(args):
+    if args[:1] == ['--unix']:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(args[1])
+        return sock
+    host = args[0] if args else '127.0.0.1'
+    port = int(args[1]) if len(args) > 1 else 8765
+    return socket.create_connection((host, port))
+
+
+if __name__ == '__main__':
+    viewer = SpectatorViewer(connect(sys.argv[1:]))
+    try:
+        viewer.run()
+    except ConnectionError as e:
+        print(e)
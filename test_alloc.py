@@ -0,0 +1,88 @@
+"""
+Allocation regression test for the per-frame path. Runs a headless game
+until it reaches a steady state, then traces more frames with tracemalloc and
+fails if the traced memory grew by more than the allowed bytes per frame, or
+if the short-lived allocations of any single frame peaked over the allowed
+size. The limits sit just above what the game measures now (about 4 bytes
+per frame retained and a 4.2 KB worst frame peak), so raise them only
+together with a change that needs it.
+
+    python -m pytest test_alloc.py
+
+tracemalloc only sees allocations made through Python's allocator. Memory
+that SDL allocates in C is not traced: the surface rotozoom returns every
+time Asteroid._spin rotates an image, and text the overlays render. Those are
+bounded by caching instead, see test_spins_are_cached and the hit rates on
+the debug overlay.
+"""
+import os
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest  # noqa: E402
+
+from alien_invasion import AlienInvasion  # noqa: E402
+
+WARMUP_FRAMES = 300
+FRAMES = 600
+DT = 1 / 60
+
+# limits on what the traced frames may allocate
+MAX_BYTES_PER_FRAME = 6
+MAX_FRAME_PEAK_BYTES = 6 * 1024
+
+
+@pytest.fixture(scope='module')
+def game():
+    game = AlienInvasion(headless=True, render_h=270)
+    game.state = 'game'
+    game.new_game(seed=0)
+    run(game, WARMUP_FRAMES)
+    return game
+
+
+def play_frame(game, i):
+    """Play one frame, firing now and then"""
+    if i % 20 == 0:
+        game.ship.fire_bullet()
+    game._update_game(DT)
+    game._draw_screen()
+
+
+def run(game, count):
+    """Play count frames"""
+    for i in range(count):
+        play_frame(game, i)
+
+
+def test_steady_state_allocations(game):
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    worst_peak = 0
+    for i in range(FRAMES):
+        # the peak of each frame on its own, so one large temporary
+        # allocation fails the test even if it is freed again
+        frame_start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        play_frame(game, i)
+        _, peak = tracemalloc.get_traced_memory()
+        worst_peak = max(worst_peak, peak - frame_start)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert (end - start) / FRAMES <= MAX_BYTES_PER_FRAME
+    assert worst_peak <= MAX_FRAME_PEAK_BYTES
+
+
+def test_spins_are_cached(game):
+    # with a rotation step, most frames reuse the rotated image instead of
+    # allocating a new one in C
+    game.asteroids.set_rotation_step(10)
+    stats = game.asteroids.spin_stats
+    stats.clear()
+    run(game, FRAMES)
+    game.asteroids.set_rotation_step(0)
+
+    assert stats.hit_rate > 0.5
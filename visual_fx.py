@@ -1,9 +1,14 @@
 import pygame as pg
 from pygame.sprite import Sprite, Group
-import random as rand
+import math
 import os
+import random
 
+from assets import list_assets, load_image
+from atlas import TextureAtlas
 from settings import scale
+from metrics import CacheStats
+from render import LAYER_BG, LAYER_FX
 
 
 class AsteroidGroup(Group):
@@ -15,47 +20,81 @@ class AsteroidGroup(Group):
         self.image_pool = []
         self.image_folder = os.path.join('images/', 'asteroids/')
         self._load_images()
+        # spins that re-used the current image (hits) or rotated it (misses)
+        self.spin_stats = CacheStats()
 
         self.num_asteroids = game.vars.num_asteroids
+        # every asteroid ever built, only some may be active in the group
+        self.asteroid_pool = []
         self._build_self()
 
     def _load_images(self):
         """
         Load then scale each image in the asteroid image folder into the
         group's image list as a tuple containing the surface and rect of each
-        image.
+        image. The scaled images are packed into one atlas, the pool holds
+        subsurfaces of it that the asteroids rotate from.
         """
-        self.image_pool: list = [
-            pg.image.load(self.image_folder + file_name).convert_alpha()
-            for file_name in os.listdir(self.image_folder)
+        images = [
+            scale(load_image(self.image_folder + file_name).convert_alpha(),
+                  self.game.screen, self.game.vars.asteroid_scale)[0]
+            for file_name in list_assets(self.image_folder)
         ]
-        # scale each loaded surface and also return a rect for each surface
+        self.atlas = TextureAtlas(images)
         # asteroid_images = [(Surface, Rect), ...]
-        for i, image in enumerate(self.image_pool):
-            self.image_pool[i]: tuple = scale(
-                image, self.game.screen, self.game.vars.asteroid_scale
-            )
+        self.image_pool: list = [
+            (frame, frame.get_rect()) for frame in self.atlas.frames
+        ]
 
-    def get_random_image(self) -> tuple:
-        """Return the surface and rectangle of a random asteroid image"""
-        return rand.choice(self.image_pool)
+    def get_random_image(self) -> int:
+        """Return the pool index of a random asteroid image"""
+        return self.game.rng.randrange(len(self.image_pool))
 
     def _build_self(self):
         """
         Initialize and add each asteroid to the group using a random image for
         each asteroid.
         """
-        self.add(*[
+        self.asteroid_pool = [
             Asteroid(self)
             for _ in range(self.num_asteroids)
+        ]
+        self.add(*self.asteroid_pool)
+
+    def reset(self):
+        """Replace every asteroid with a newly randomized one"""
+        self.empty()
+        self._build_self()
+
+    def submit(self, frame):
+        """Submit each active asteroid that is on screen"""
+        screen_rect = self.game.rect
+        frame.submit_many(LAYER_FX, [
+            (asteroid.image, asteroid.rect.topleft)
+            for asteroid in self.sprites()
+            if asteroid.rect.colliderect(screen_rect)
         ])
 
+    def set_active_count(self, count):
+        """Keep only the first 'count' asteroids of the pool in the group"""
+        self.empty()
+        self.add(*self.asteroid_pool[:count])
+
+    def set_rotation_step(self, step):
+        """
+        Set the angle in degrees that each asteroid must turn before its
+        image is rotated again. 0 rotates the image every frame.
+        """
+        for asteroid in self.asteroid_pool:
+            asteroid.rotation_step = step
+
 
 class Asteroid(Sprite):
     """
     An asteroid that randomly changes location image, size, and velocity.
     Gives the appearance of multiple asteroids entering and exiting the screen
     """
+
     def __init__(self, fleet):
         super().__init__()
         # get game info
@@ -66,49 +105,97 @@ class Asteroid(Sprite):
         # default x and y velocity
         self.vel_x = self.vel_y = self.base_vel = self.vars.asteroid_velocity
 
-        self.image, self.rect = self.fleet.get_random_image()
+        self.rng = self.game.rng
+        self.image_index = self.fleet.get_random_image()
+        self.image, rect = self.fleet.image_pool[self.image_index]
+        # the pool rect is shared, each asteroid moves its own copy
+        self.rect = rect.copy()
         self.rect.center = self._random_location()
 
         # rotation info
         self.degree = 0.0
+        # the image is only rotated again once the angle has moved this many
+        # degrees. angle holds the angle of the current image
+        self.rotation_step = 0
+        self.angle = None
         self.rotation_vel = self.base_rotation_vel = self.vars.asteroid_rps
         # applied each time rotozoom is called in _spin()
         self.scale = 1
         # used for resetting image between rotations in _spin()
         self.base_img = self.image
+        # side of a square that holds the image at any rotation
+        self.bound = self._rotation_bound()
 
         # track location by float for better accuracy
         self.centerx, self.centery = map(float, self.rect.center)
 
     def update(self, dt):
         """
-        Handles the rotation and movement of the asteroid
+        Handles the rotation and movement of the asteroid. Off-screen
+        asteroids keep turning and moving but skip rotating their image.
         """
         self._check_screen_exit()
-        self._spin(dt)
+        # increment spin
+        self.degree += self.rotation_vel * dt
+        self._update_image()
         # move the asteroid by its velocity in pixels per second
         self.centerx += self.vel_x * dt
         self.centery += self.vel_y * dt
         self.rect.centerx = self.centerx
         self.rect.centery = self.centery
 
-    def _spin(self, dt):
+    def _update_image(self):
+        """Rotate the image if the asteroid can be seen, otherwise sleep"""
+        half = self.bound / 2
+        g_rect = self.game.rect
+        if (-half < self.centerx < g_rect.w + half
+                and -half < self.centery < g_rect.h + half):
+            self._spin()
+        else:
+            self._sleep()
+
+    def _sleep(self):
+        """
+        Off screen, the image is left as it is. The rect becomes the square
+        that fits every rotation so the screen exit checks do not depend on
+        the last angle drawn, and the image is rotated again on waking.
+        """
+        self.angle = None
+        self.rect.size = (self.bound, self.bound)
+        self.rect.center = self.centerx, self.centery
+
+    def _rotation_bound(self):
+        """Return the side of the square holding any rotation of the image"""
+        w, h = self.base_img.get_size()
+        return math.ceil(math.hypot(w, h) * self.scale) + 2
+
+    def _spin(self):
         """
         Using a copy of the asteroid image created at init, rotate the original
         image surface to the the current degree of the asteroid object.
         -Assign the rotated image to self.image
         This method is needed as images tend to get corrupted over multiple
         rotations. Rotozoom is used here as well to size the asteroid to it's
-        current scale.
+        current scale. The rotation is skipped while the angle has not moved
+        a full rotation step.
         """
-        # increment spin
-        self.degree += self.rotation_vel * dt
+        angle = self.degree
+        if self.rotation_step:
+            angle -= angle % self.rotation_step
+        if angle == self.angle:
+            self.fleet.spin_stats.hits += 1
+            return
+        self.fleet.spin_stats.misses += 1
+        self.angle = angle
 
         self.image = pg.transform.rotozoom(
-            self.base_img, self.degree, self.scale
+            self.base_img, angle, self.scale
         )
         # preserve the center of the rectangle to produce smooth movement.
-        self.rect = self.image.get_rect(center=self.rect.center)
+        # The rect is resized in place rather than replaced
+        center = self.rect.center
+        self.rect.size = self.image.get_size()
+        self.rect.center = center
 
     def _check_screen_exit(self) -> None:
         """
@@ -117,33 +204,53 @@ class Asteroid(Sprite):
         """
 
         # return None if the asteroid is still in the screen
-        if self.rect.colliderect(self.game.rect):
+        rect = self.rect
+        if rect.colliderect(self.game.rect):
             return None
 
         screen_w = self.game.rect.width
         screen_h = self.game.rect.height
 
         # check that the asteroid is actually heading away from the screen
-        if any([
-            self.rect.right < 0 and self.vel_x < 0,
-            self.rect.left > screen_w and self.vel_x > 0,
-            self.rect.bottom < 0 and self.vel_y < 0,
-            self.rect.top > screen_h and self.vel_y > 0
-        ]):
+        if (rect.right < 0 and self.vel_x < 0
+                or rect.left > screen_w and self.vel_x > 0
+                or rect.bottom < 0 and self.vel_y < 0
+                or rect.top > screen_h and self.vel_y > 0):
             self.degree = 0
+            self.angle = None
             self._randomize_asteroid()
             self._teleport_asteroid()
 
             self._adjust_brightness()
 
+    def restore(self, image_index, centerx, centery, vel_x, vel_y, degree,
+                rotation_vel, scale):
+        """Put the asteroid back into a saved state"""
+        self.image_index = image_index
+        self.base_img = self.fleet.image_pool[image_index][0]
+        self.centerx, self.centery = centerx, centery
+        self.vel_x, self.vel_y = vel_x, vel_y
+        self.degree = degree
+        self.rotation_vel = rotation_vel
+        self.scale = scale
+
+        self.rect = self.base_img.get_rect(center=(centerx, centery))
+        self.bound = self._rotation_bound()
+        # force the image to be rotated to the saved angle
+        self.angle = None
+        self._update_image()
+
     def _randomize_asteroid(self):
         """Randomly change the asteroid's velocity and rotation and image"""
         def randomize(vel):
-            return vel * rand.choice([1, -1]) * rand.uniform(.5, 2)
+            return vel * self.rng.choice([1, -1]) * self.rng.uniform(.5, 2)
         # randomly choose an image
-        self.base_img, self.rect = self.fleet.get_random_image()
+        self.image_index = self.fleet.get_random_image()
+        self.base_img, rect = self.fleet.image_pool[self.image_index]
+        self.rect = rect.copy()
         # randomize size
-        self.scale = rand.uniform(.25, 1.25)
+        self.scale = self.rng.uniform(.25, 1.25)
+        self.bound = self._rotation_bound()
         # randomize velocities
         self.vel_x = randomize(self.base_vel)
         self.vel_y = randomize(self.base_vel)
@@ -159,14 +266,14 @@ class Asteroid(Sprite):
         self.centerx, self.centery = map(float, self.rect.center)
 
         # invert velocity as needed to make the asteroid move into the screen
-        if any([self.rect.bottom < 0 and self.vel_y < 0,
-                self.rect.top > self.game.rect.bottom and self.vel_y > 0
-                ]):
+        rect = self.rect
+        g_rect = self.game.rect
+        if (rect.bottom < 0 and self.vel_y < 0
+                or rect.top > g_rect.bottom and self.vel_y > 0):
             self.vel_x *= -1
 
-        if any([self.rect.right < 0 and self.vel_x < 0,
-                self.rect.left > self.game.rect.right and self.vel_x > 0
-                ]):
+        if (rect.right < 0 and self.vel_x < 0
+                or rect.left > g_rect.right and self.vel_x > 0):
             self.vel_y *= -1
 
     def _random_location(self, reentry_time=1.0):
@@ -181,7 +288,7 @@ class Asteroid(Sprite):
         # approximate distance away from visible part of display in seconds
         dist = reentry_time * abs(self.vel_x)
 
-        return rand.choice(
+        return self.rng.choice(
             ((-dist, -dist), (g_rect.centerx, -dist), (g_rect.w+dist, -dist),
              (-dist, g_rect.centery), (-dist, g_rect.h+dist),
              (g_rect.centerx, g_rect.h+dist), (g_rect.w+dist, g_rect.h+dist))
@@ -194,3 +301,125 @@ class Asteroid(Sprite):
         to screen.
         """
         pass
+
+
+class Starfield:
+    """
+    A parallax backdrop of layers scrolling down at different speeds. The far
+    layer is the background image, mirrored below itself so it wraps without
+    a seam, and drawn as the two strips of that tall source that fill the
+    screen: one screen of opaque pixels, the same as the static background.
+    The nearer layers are not full screen surfaces but their stars, each a
+    small dot blitted at its own rect. The rects and source areas are moved
+    in place, so scrolling builds no new blit sequence.
+    """
+    def __init__(self, game, bg):
+        self.game = game
+        self.vars = game.vars
+        self.w, self.h = game.rect.size
+
+        source = pg.Surface((self.w, 2 * self.h)).convert()
+        source.blit(bg, (0, 0))
+        source.blit(pg.transform.flip(bg, False, True), (0, self.h))
+        self.far = ScrollingImage(source, self.h, self.vars.starfield_speed)
+
+        # stars get their own generator, the game's one is saved with the game
+        rng = random.Random(self.vars.starfield_seed)
+        self.layers = [
+            StarLayer(self.vars, rng, game.rect.size, *layer)
+            for layer in self.vars.star_layers
+        ]
+
+        # the active layers and their blit sequence, the layers change in
+        # place so the sequence is only rebuilt by set_layer_count()
+        self.active = []
+        self.blits = []
+        self.set_layer_count(len(self.layers))
+
+    def set_layer_count(self, count):
+        """Draw the background and the 'count' farthest star layers"""
+        self.active = self.layers[:count]
+        self.blits = list(self.far.blits)
+        for layer in self.active:
+            self.blits.extend(layer.blits)
+
+    def update(self, dt):
+        """Scroll every drawn layer by its speed"""
+        self.far.advance(dt)
+        for layer in self.active:
+            layer.advance(dt)
+
+    def submit(self, frame):
+        """Submit the layers, farthest first"""
+        frame.submit_many(LAYER_BG, self.blits)
+
+
+class ScrollingImage:
+    """
+    A screen wide source scrolling down, wrapping around its height. Drawn
+    as two strips: the source from row source_y down to its end, then its
+    top for whatever is left of the screen.
+    """
+    def __init__(self, source, screen_h, speed):
+        self.source = source
+        self.screen_h = screen_h
+        self.w, self.source_h = source.get_size()
+        self.speed = speed * screen_h  # pixels per second
+        self.scroll = 0.0
+
+        self.top_area = pg.Rect(0, 0, self.w, screen_h)
+        self.bottom_dest = pg.Rect(0, screen_h, self.w, 0)
+        self.bottom_area = pg.Rect(0, 0, self.w, 0)
+        self.blits = (
+            (source, (0, 0), self.top_area),
+            (source, self.bottom_dest, self.bottom_area),
+        )
+
+    def advance(self, dt):
+        self.scroll = (self.scroll + self.speed * dt) % self.source_h
+        # scrolling down shows ever earlier rows of the source at the top
+        source_y = -int(self.scroll) % self.source_h
+        first = min(self.screen_h, self.source_h - source_y)
+        self.top_area.y = source_y
+        self.top_area.h = first
+        self.bottom_dest.y = first
+        self.bottom_area.h = self.screen_h - first
+
+
+class StarLayer:
+    """
+    Sparse stars scrolling down together, wrapping around the screen. Each
+    star is a dot surface and a rect, the rects are moved in place.
+    """
+    def __init__(self, vars, rng, size, speed, count, radius, brightness):
+        w, h = size
+        self.speed = speed * h  # pixels per second
+        self.scroll = 0.0
+        # a star leaves the bottom completely before it enters at the top
+        self.diameter = 2 * radius + 1
+        self.period = h + self.diameter
+
+        self.base_y = []
+        self.rects = []
+        self.blits = []
+        for _ in range(count):
+            # never pure black, that is the colorkey
+            value = max(1, int(brightness * rng.uniform(.5, 1.0)))
+            dot = pg.Surface((self.diameter, self.diameter)).convert()
+            dot.fill(vars.black_rgb)
+            dot.set_colorkey(vars.black_rgb)
+            pg.draw.circle(dot, (value, value, value), (radius, radius),
+                           radius)
+            rect = dot.get_rect(x=rng.randrange(w - self.diameter))
+            self.base_y.append(rng.randrange(self.period))
+            self.rects.append(rect)
+            self.blits.append((dot, rect))
+        self.advance(0)
+
+    def advance(self, dt):
+        self.scroll = (self.scroll + self.speed * dt) % self.period
+        scroll = int(self.scroll)
+        period = self.period
+        diameter = self.diameter
+        for rect, base_y in zip(self.rects, self.base_y):
+            rect.y = (base_y + scroll) % period - diameter
@@ -0,0 +1,249 @@
+"""
+Data driven alien waves. Each JSON file in the wave folder describes one
+wave: its formation, row and column counts, an optional entry path and the
+path the aliens follow once they are in formation. Positions and distances
+in the files are fractions of the screen width (x) and height (y), speeds are
+screen widths per second.
+
+When a wave is loaded its paths are baked into PathTables, so the position
+of an alien at any time is a table lookup instead of per-frame math.
+
+Example wave file:
+    {
+        "name": "swoop",
+        "formation": "v",            "grid" or "v"
+        "rows": 4, "columns": 7,     defaults are the Vars fleet settings
+        "entry": {
+            "type": "sine_swoop",    "drop_in", "sine_swoop" or "spline"
+            "time": 2.0,             seconds for each alien to enter
+            "stagger": 0.1,          extra delay per alien in seconds
+            "curve": "ease_out"      speed curve, see EASINGS
+        },
+        "path": {
+            "type": "sine",          "bounce", "sine", "spline" or "none"
+            "amplitude": 0.1, "period": 4.0, "descent": 0.02
+        }
+    }
+"""
+from array import array
+import json
+import math
+import os
+
+from assets import list_assets, open_asset
+
+# samples per second of every baked path
+PATH_RATE = 120
+
+# speed curves, map normalized time to normalized distance along a path
+EASINGS = {
+    'linear': lambda u: u,
+    'ease_in': lambda u: u * u,
+    'ease_out': lambda u: 1 - (1 - u) ** 2,
+    'ease_in_out': lambda u: u * u * (3 - 2 * u),
+}
+
+
+class PathTable:
+    """
+    A path baked into evenly spaced position samples. Looping tables repeat
+    forever, moving by 'drift' each time they wrap around. Other tables hold
+    their last position once the path is over.
+    """
+    def __init__(self, points, loop=False, drift=(0.0, 0.0)):
+        self.xs = array('d', (p[0] for p in points))
+        self.ys = array('d', (p[1] for p in points))
+        self.length = len(self.xs)
+        self.duration = (self.length - 1) / PATH_RATE
+        self.loop = loop
+        self.drift_x, self.drift_y = drift
+
+    def lookup(self, t):
+        """Return the (x, y) offset at t seconds along the path"""
+        i = int(t * PATH_RATE)
+        if i <= 0:
+            return self.xs[0], self.ys[0]
+        if self.loop:
+            laps, i = divmod(i, self.length)
+            return (self.xs[i] + laps * self.drift_x,
+                    self.ys[i] + laps * self.drift_y)
+        if i >= self.length:
+            i = self.length - 1
+        return self.xs[i], self.ys[i]
+
+
+def load_wave_specs(folder):
+    """Return the wave dicts of every JSON file in folder, sorted by name"""
+    specs = []
+    for file_name in list_assets(folder):
+        if file_name.endswith('.json'):
+            with open_asset(os.path.join(folder, file_name)) as f:
+                specs.append(json.load(f))
+    return specs
+
+
+class Wave:
+    """
+    A loaded wave: the formation slots and the baked entry and formation
+    paths. motion() gives the alien in each slot its base position, its
+    phase along the formation path and its entry delay.
+    """
+    def __init__(self, spec, game, alien_size):
+        self.game = game
+        self.vars = game.vars
+        self.screen_w, self.screen_h = game.rect.size
+        self.alien_w, self.alien_h = alien_size
+
+        self.name = spec.get('name', 'wave')
+        self.rows = spec.get('rows', self.vars.fleet_rows)
+        self.columns = spec.get('columns', self.vars.fleet_columns)
+
+        self.slots = self._build_formation(spec.get('formation', 'grid'))
+
+        entry = spec.get('entry')
+        self.entry = self._bake_entry(entry) if entry else None
+        self.entry_time = self.entry.duration if self.entry else 0.0
+        self.stagger = entry.get('stagger', 0.0) if entry else 0.0
+
+        path = spec.get('path', {'type': 'bounce'})
+        self.path = self._bake_path(path)
+        # bounce aliens each keep to their own lane of the bounce, other
+        # paths move the formation as one
+        self.per_alien_phase = path['type'] == 'bounce'
+        self.speed = path.get('speed', self.vars.alien_vel_x / self.screen_w)
+
+    def motion(self, index):
+        """
+        Return (base_x, base_y, phase, delay) for the alien in slot index.
+        The alien's position at wave time t is
+            base + path(phase + time in formation) + entry(t - delay)
+        """
+        slot_x, slot_y = self.slots[index]
+        phase = 0.0
+        if self.per_alien_phase:
+            phase = slot_x / (self.speed * self.screen_w)
+        path_x, path_y = self.path.lookup(phase)
+        return slot_x - path_x, slot_y - path_y, phase, index * self.stagger
+
+    def _build_formation(self, formation):
+        """Return the top-left position of every slot in the formation"""
+        usable_w = self.screen_w
+        usable_h = .55 * self.screen_h
+        hoz_spacing = usable_w / self.columns
+        vert_spacing = usable_h / self.rows
+
+        slots = []
+        for row in range(self.rows):
+            for column in range(self.columns):
+                x = column * hoz_spacing
+                y = row * vert_spacing
+                if formation == 'v':
+                    # the outer columns sit lower than the middle one
+                    middle = (self.columns - 1) / 2
+                    y = row * vert_spacing * .6 \
+                        + abs(column - middle) * vert_spacing * .5
+                slots.append((x, y))
+        return slots
+
+    def _bake_entry(self, entry):
+        """
+        Bake the entry path. Entry offsets are relative to the alien's slot
+        and always end at (0, 0).
+        """
+        ease = EASINGS[entry.get('curve', 'linear')]
+        duration = entry.get('time', 1.5)
+        kind = entry['type']
+        # entering aliens start above the top of the screen
+        start_y = -(self.screen_h * .55 + self.alien_h)
+
+        if kind == 'spline':
+            control = [(x * self.screen_w, y * self.screen_h)
+                       for x, y in entry['points']] + [(0.0, 0.0)]
+            def position(u): return catmull_rom(control, u)
+        elif kind == 'sine_swoop':
+            amplitude = entry.get('amplitude', .15) * self.screen_w
+            swings = entry.get('waves', 2)
+            def position(u):
+                return (amplitude * math.sin(swings * math.pi * u) * (1 - u),
+                        start_y * (1 - u))
+        else:  # 'drop_in'
+            def position(u): return 0.0, start_y * (1 - u)
+
+        samples = max(2, int(duration * PATH_RATE) + 1)
+        return PathTable([
+            position(ease(i / (samples - 1))) for i in range(samples)
+        ])
+
+    def _bake_path(self, path):
+        """Bake the path the formation follows after entering"""
+        kind = path['type']
+
+        if kind == 'bounce':
+            # the classic movement: cross the screen, drop, cross back, drop
+            speed = path.get('speed', self.vars.alien_vel_x / self.screen_w)
+            drop = path.get('drop', self.vars.fleet_drop_height / self.screen_h)
+            lane = self.screen_w - self.alien_w
+            speed *= self.screen_w
+            drop *= self.screen_h
+            samples = max(2, int(2 * lane / speed * PATH_RATE))
+            points = []
+            for i in range(samples):
+                distance = i / PATH_RATE * speed
+                if distance < lane:
+                    points.append((distance, 0.0))
+                else:
+                    points.append((2 * lane - distance, drop))
+            return PathTable(points, loop=True, drift=(0.0, 2 * drop))
+
+        if kind == 'sine':
+            amplitude = path.get('amplitude', .1) * self.screen_w
+            period = path.get('period', 4.0)
+            descent = path.get('descent', .02) * self.screen_h  # per second
+            samples = max(2, int(period * PATH_RATE))
+            return PathTable([
+                (amplitude * math.sin(2 * math.pi * i / samples),
+                 descent * i / PATH_RATE)
+                for i in range(samples)
+            ], loop=True, drift=(0.0, descent * period))
+
+        if kind == 'spline':
+            # a closed loop through the control points, drifting down
+            control = [(x * self.screen_w, y * self.screen_h)
+                       for x, y in path['points']]
+            period = path.get('period', 4.0)
+            descent = path.get('descent', .02) * self.screen_h
+            samples = max(2, int(period * PATH_RATE))
+            return PathTable([
+                catmull_rom(control, i / samples, closed=True)
+                for i in range(samples)
+            ], loop=True, drift=(0.0, descent * period))
+
+        # 'none', hold the formation still
+        return PathTable([(0.0, 0.0)])
+
+
+def catmull_rom(points, u, closed=False):
+    """
+    Return the point at u (0 - 1) along a Catmull-Rom spline through points.
+    Open splines start at the first point and end at the last one.
+    """
+    count = len(points)
+    if u >= 1 and not closed:
+        return points[-1]
+    segments = count if closed else count - 1
+    position = min(u, .999999) * segments
+    segment = int(position)
+    t = position - segment
+
+    def point(i):
+        if closed:
+            return points[i % count]
+        return points[max(0, min(count - 1, i))]
+
+    p0, p1, p2, p3 = (point(segment + i) for i in (-1, 0, 1, 2))
+    t2, t3 = t * t, t * t * t
+    return tuple(
+        .5 * (2 * b + (c - a) * t + (2 * a - 5 * b + 4 * c - d) * t2
+              + (3 * b - a - 3 * c + d) * t3)
+        for a, b, c, d in zip(p0, p1, p2, p3)
+    )